@@ -1,21 +1,30 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, BackgroundTasks, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Optional
 import uuid
+from datetime import datetime
 import asyncio
+import pickle
+import threading
 from services.services import db
 import os
 from pathlib import Path
-from api.tasks import celery_app
+from api.tasks import send_task, bulk_send
 try:
     from services.neo4j_helper import fetch_graph as neo4j_fetch
 except Exception:
     neo4j_fetch = None
-import json
+import orjson
 
 
-app = FastAPI(title="Learning Pipeline API")
+app = FastAPI(title="Learning Pipeline API", default_response_class=ORJSONResponse)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
 
 # Serve static files
 static_dir = Path(__file__).parent / "static"
@@ -32,6 +41,122 @@ async def root():
 # (Batch processing is now handled by Celery tasks.)
 
 
+# path -> (mtime, size, value) for the file-based counts in /batch/status.
+_file_stat_cache = {}
+
+
+def _cached_by_mtime(path: Path, compute):
+    """Return compute(path), recomputing only when the file's mtime or size changes."""
+    st = path.stat()
+    cached = _file_stat_cache.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    value = compute(path)
+    _file_stat_cache[path] = (st.st_mtime_ns, st.st_size, value)
+    return value
+
+
+def _count_lines(path: Path) -> int:
+    # Count newlines over raw 1 MiB chunks; bytes.count runs in C. A last line
+    # without a trailing newline still counts, as it does when iterating lines.
+    count = 0
+    last = b''
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            count += chunk.count(b'\n')
+            last = chunk
+    if last and not last.endswith(b'\n'):
+        count += 1
+    return count
+
+
+def _count_json_items(path: Path) -> int:
+    with path.open('rb') as f:
+        return len(orjson.loads(f.read()))
+
+
+# ((mtime_ns, size), {word: byte offset}) for the enriched.jsonl fallback in get_solidified.
+_enriched_index = None
+_enriched_index_lock = threading.Lock()
+
+
+def _build_enriched_index(path: Path) -> dict:
+    index = {}
+    offset = 0
+    with path.open('rb') as f:
+        for line in f:
+            try:
+                word = orjson.loads(line).get('word')
+            except Exception:
+                word = None
+            if word is not None:
+                index.setdefault(word, offset)
+            offset += len(line)
+    return index
+
+
+def _enriched_offsets(path: Path) -> dict:
+    """Return a word -> byte offset index for `path`, rebuilt only when the file changes.
+
+    The index is pickled next to the data file (`enriched.idx`) together with
+    the data file's (mtime_ns, size) at build time, so it survives restarts and
+    is reused only while the file is unchanged; concurrent callers share a
+    single rebuild via the lock.
+    """
+    global _enriched_index
+    st = path.stat()
+    key = (st.st_mtime_ns, st.st_size)
+    if _enriched_index and _enriched_index[0] == key:
+        return _enriched_index[1]
+    with _enriched_index_lock:
+        if _enriched_index and _enriched_index[0] == key:
+            return _enriched_index[1]
+        idx_path = path.with_suffix('.idx')
+        index = None
+        try:
+            if idx_path.exists():
+                with idx_path.open('rb') as f:
+                    idx_mtime, idx_size, idx = pickle.load(f)
+                if (idx_mtime, idx_size) == key:
+                    index = idx
+        except Exception:
+            index = None
+        if index is None:
+            # Stamped with the stat taken before the scan: lines appended while
+            # it runs change the file's stat, so the next call rebuilds.
+            index = _build_enriched_index(path)
+            tmp = f"{idx_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, 'wb') as f:
+                    pickle.dump((*key, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, idx_path)
+            except Exception:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+        _enriched_index = (key, index)
+        return index
+
+
+def _set_job_doc(job_id: str, data: dict):
+    # create(), not set(): if the worker has already started the job, its
+    # 'running' doc must not be overwritten by the 'queued' one.
+    try:
+        db.collection('jobs').document(job_id).create(data)
+    except Exception:
+        pass
+
+
+def _queue_job_doc(job_id: str, job_doc: dict):
+    """Writes the job's 'queued' doc off the request path.
+
+    The worker's _start_job merges onto it, and also writes `job_doc` itself
+    in case this write failed.
+    """
+    asyncio.get_running_loop().run_in_executor(None, _set_job_doc, job_id, {**job_doc, 'status': 'queued'})
+
+
 class StartJobRequest(BaseModel):
     mode: str = "quick"  # quick or deep
 
@@ -39,17 +164,13 @@ class StartJobRequest(BaseModel):
 @app.post("/jobs/start")
 async def start_job(req: StartJobRequest):
     job_id = str(uuid.uuid4())
-    # create job doc
-    db.collection('jobs').document(job_id).set({
-        'status': 'queued',
+    job_doc = {
         'mode': req.mode,
-        'created_at': __import__('datetime').datetime.utcnow().isoformat(),
-        'progress': 0,
+        'created_at': _now(),
         'errors': []
-    })
-
-    # enqueue celery task
-    celery_app.send_task('api.tasks.run_learning_job', args=[job_id, req.mode])
+    }
+    _queue_job_doc(job_id, job_doc)
+    send_task('api.tasks.run_learning_job', [job_id, req.mode], {'job_doc': job_doc})
 
     return {"job_id": job_id}
 
@@ -58,16 +179,14 @@ async def start_job(req: StartJobRequest):
 async def start_big_job():
     """Start a long-running raw-data "big learning" job that runs up to 10 minutes."""
     job_id = str(uuid.uuid4())
-    db.collection('jobs').document(job_id).set({
-        'status': 'queued',
+    job_doc = {
         'mode': 'big',
-        'created_at': __import__('datetime').datetime.utcnow().isoformat(),
-        'progress': 0,
+        'created_at': _now(),
         'errors': [],
         'meta': {'target_words_per_round': 1000}
-    })
-
-    celery_app.send_task('api.tasks.run_big_learning_job', args=[job_id])
+    }
+    _queue_job_doc(job_id, job_doc)
+    send_task('api.tasks.run_big_learning_job', [job_id], {'job_doc': job_doc})
     return {"job_id": job_id}
 
 
@@ -81,20 +200,19 @@ async def run_batch():
     """
     # Create a job document and enqueue a Celery task to process batches.
     job_id = str(uuid.uuid4())
-    try:
-        db.collection('jobs').document(job_id).set({
-            'status': 'queued',
-            'mode': 'batch_enrich',
-            'created_at': __import__('datetime').datetime.utcnow().isoformat(),
-            'progress': 0,
-            'errors': []
-        })
-    except Exception:
-        # Firestore may be unavailable; still enqueue the task and return job_id
-        pass
+    job_doc = {
+        'status': 'queued',
+        'mode': 'batch_enrich',
+        'created_at': _now(),
+        'progress': 0,
+        'errors': []
+    }
+    # Write the job doc off the request path; Firestore may be unavailable,
+    # in which case the task is still enqueued and the job_id returned.
+    _queue_job_doc(job_id, job_doc)
 
     # enqueue Celery task
-    celery_app.send_task('api.tasks.run_batch_enrich', args=[job_id])
+    send_task('api.tasks.run_batch_enrich', [job_id])
     return {'status': 'queued', 'job_id': job_id}
 
 
@@ -128,12 +246,9 @@ async def batch_status():
     done = 0
     try:
         if cand.exists():
-            with cand.open('r', encoding='utf-8') as f:
-                arr = json.load(f)
-                total = len(arr)
+            total = _cached_by_mtime(cand, _count_json_items)
         if enriched.exists():
-            with enriched.open('r', encoding='utf-8') as f:
-                done = sum(1 for _ in f)
+            done = _cached_by_mtime(enriched, _count_lines)
     except Exception:
         pass
     return {'total_candidates': total, 'enriched_count': done}
@@ -143,7 +258,14 @@ class GenerateRequest(BaseModel):
     message: str
 
 
-@app.post('/generate')
+class GenerateResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', arbitrary_types_allowed=False)
+
+    response: Optional[str] = None
+    provider: Optional[str] = None
+
+
+@app.post('/generate', response_model=GenerateResponse, response_model_exclude_none=True)
 async def generate_text(req: GenerateRequest):
     """Generate a response using available providers (best-effort).
 
@@ -151,7 +273,8 @@ async def generate_text(req: GenerateRequest):
     """
     try:
         from services.ai_providers import generate_text as gen_with_meta
-        out = gen_with_meta(req.message)
+        # Run off the event loop so concurrent identical requests can be coalesced.
+        out = await asyncio.to_thread(gen_with_meta, req.message)
         # gen_with_meta returns {'response': text, 'provider': name}
         if isinstance(out, dict):
             return {'response': out.get('response'), 'provider': out.get('provider')}
@@ -160,22 +283,48 @@ async def generate_text(req: GenerateRequest):
         return {'response': f"(local-echo) {req.message}", 'provider': 'local-echo'}
 
 
-@app.get("/jobs/{job_id}")
+class JobResponse(BaseModel):
+    """Fields a job doc may carry; unset ones are dropped from the response.
+
+    Fields not listed here (extras workers or job_doc add later) are passed through.
+    """
+    model_config = ConfigDict(extra='allow', arbitrary_types_allowed=False)
+
+    status: Optional[str] = None
+    mode: Optional[str] = None
+    progress: int = 0
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    errors: Optional[list[str]] = None
+    concept_id: Optional[str] = None
+    skipped: Optional[str] = None
+    last_round: Optional[int] = None
+    rounds: Optional[int] = None
+    total_tokens: Optional[int] = None
+    checked: Optional[int] = None
+    meta: Optional[dict[str, Any]] = None
+    result: Optional[Any] = None
+    reconcile_report: Optional[dict[str, Any]] = None
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse, response_model_exclude_none=True)
 async def get_job(job_id: str):
     doc = db.collection('jobs').document(job_id).get()
     if not doc.exists:
-        return {"error": "job not found"}
+        return ORJSONResponse({"error": "job not found"}, status_code=404)
     return doc.to_dict()
 
 
-@app.get('/neo4j/graph')
+@app.get('/neo4j/graph', response_class=ORJSONResponse)
 async def get_neo4j_graph(limit: int = 1000):
     """Return a graph projection from Neo4j if configured."""
     if not neo4j_fetch:
         return JSONResponse({'error': 'Neo4j not configured'}, status_code=404)
     try:
         g = neo4j_fetch(limit=limit)
-        return g
+        # Arbitrary nested dict: hand it straight to orjson, skipping jsonable_encoder
+        return ORJSONResponse(content=g)
     except Exception as e:
         return JSONResponse({'error': str(e)}, status_code=500)
 
@@ -194,14 +343,11 @@ async def get_solidified(concept_id: str):
         solid = base / 'data' / 'enriched.jsonl'
         try:
             if solid.exists():
-                with solid.open('r', encoding='utf-8') as f:
-                    for line in f:
-                        try:
-                            entry = json.loads(line)
-                            if entry.get('word') == concept_id:
-                                return entry
-                        except Exception:
-                            continue
+                offset = _enriched_offsets(solid).get(concept_id)
+                if offset is not None:
+                    with solid.open('rb') as f:
+                        f.seek(offset)
+                        return orjson.loads(f.readline())
         except Exception:
             pass
         return JSONResponse({'error': 'not found'}, status_code=404)
@@ -210,11 +356,12 @@ async def get_solidified(concept_id: str):
 @app.post('/reconcile/run')
 async def run_reconcile():
     job_id = str(uuid.uuid4())
-    try:
-        db.collection('jobs').document(job_id).set({'status': 'queued', 'mode': 'reconcile', 'created_at': __import__('datetime').datetime.utcnow().isoformat()})
-    except Exception:
-        pass
-    celery_app.send_task('api.tasks.reconcile_neo4j_firestore', args=[job_id])
+    job_doc = {
+        'mode': 'reconcile',
+        'created_at': _now()
+    }
+    _queue_job_doc(job_id, job_doc)
+    send_task('api.tasks.reconcile_neo4j_firestore', [job_id], {'job_doc': job_doc})
     return {'status': 'queued', 'job_id': job_id}
 
 
@@ -227,35 +374,116 @@ async def finalize_job(req: FinalizeRequest):
     """Enqueue a finalize_concept Celery task for a concept id."""
     concept_id = req.concept_id
     job_id = str(uuid.uuid4())
+    job_doc = {
+        'mode': 'finalize',
+        'concept_id': concept_id,
+        'created_at': _now(),
+        'errors': []
+    }
+    _queue_job_doc(job_id, job_doc)
+    send_task('api.tasks.finalize_concept', [concept_id, job_id], {'job_doc': job_doc})
+    return {'status': 'queued', 'job_id': job_id}
+
+
+class FinalizeBatchRequest(BaseModel):
+    concept_ids: list[str]
+
+
+@app.post('/jobs/finalize_batch')
+async def finalize_batch(req: FinalizeBatchRequest):
+    """Enqueue finalize_concept tasks for several concept ids in one broker round-trip."""
+    job_ids = {cid: str(uuid.uuid4()) for cid in req.concept_ids}
+    created_at = _now()
+    job_docs = {cid: {'mode': 'finalize', 'concept_id': cid, 'created_at': created_at, 'errors': []}
+                for cid in job_ids}
+    for cid, job_id in job_ids.items():
+        _queue_job_doc(job_id, job_docs[cid])
+    bulk_send([
+        ('api.tasks.finalize_concept', [cid, job_id], {'job_doc': job_docs[cid]})
+        for cid, job_id in job_ids.items()
+    ])
+    return {'status': 'queued', 'job_ids': job_ids}
+
+
+class _JobWatcher:
+    """A single Firestore snapshot listener for one job, fanned out to subscriber queues.
+
+    Firestore invokes the callback on its own watch thread; snapshots are handed
+    over to the event loop, which pushes them to every connected WebSocket's queue.
+    """
+
+    def __init__(self, job_id: str, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.subscribers = set()
+        self.last = None
+        self.watch = db.collection('jobs').document(job_id).on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, snapshots, changes, read_time):
+        for snap in snapshots:
+            if snap.exists:
+                self.loop.call_soon_threadsafe(self._publish, snap.to_dict())
+
+    def _publish(self, data: dict):
+        self.last = data
+        for queue in self.subscribers:
+            queue.put_nowait(data)
+
+
+# job_id -> _JobWatcher; only touched from the event loop thread.
+_job_watchers = {}
+
+
+def _subscribe(job_id: str, queue: asyncio.Queue):
+    watcher = _job_watchers.get(job_id)
+    if watcher is None:
+        watcher = _job_watchers[job_id] = _JobWatcher(job_id, asyncio.get_running_loop())
+    watcher.subscribers.add(queue)
+    if watcher.last is not None:
+        queue.put_nowait(watcher.last)
+
+
+def _unsubscribe(job_id: str, queue: asyncio.Queue):
+    watcher = _job_watchers.get(job_id)
+    if watcher is None:
+        return
+    watcher.subscribers.discard(queue)
+    if not watcher.subscribers:
+        watcher.watch.unsubscribe()
+        del _job_watchers[job_id]
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
     try:
-        db.collection('jobs').document(job_id).set({
-            'status': 'queued',
-            'mode': 'finalize',
-            'concept_id': concept_id,
-            'created_at': __import__('datetime').datetime.utcnow().isoformat(),
-            'progress': 0,
-            'errors': []
-        })
-    except Exception:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
         pass
 
-    celery_app.send_task('api.tasks.finalize_concept', args=[concept_id, job_id])
-    return {'status': 'queued', 'job_id': job_id}
-
 
 @app.websocket("/ws/jobs/{job_id}")
 async def websocket_job(websocket: WebSocket, job_id: str):
     await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue()
+    _subscribe(job_id, queue)
+    # Detach as soon as the client goes away rather than on the next send.
+    disconnect = asyncio.create_task(_wait_for_disconnect(websocket))
     try:
         while True:
-            doc = db.collection('jobs').document(job_id).get()
-            if doc.exists:
-                await websocket.send_json(doc.to_dict())
-                data = doc.to_dict()
-                if data.get('status') in ('completed', 'failed'):
-                    break
-            await asyncio.sleep(1)
+            get = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({get, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                get.cancel()
+                return
+            data = get.result()
+            await websocket.send_json(data)
+            if data.get('status') in ('completed', 'failed'):
+                break
     except WebSocketDisconnect:
         return
     finally:
-        await websocket.close()
+        disconnect.cancel()
+        _unsubscribe(job_id, queue)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
@@ -2,19 +2,154 @@ from celery import Celery
 import os
 from services.services import db
 from logic.advanced_learning import quick_learn_unknowns, deep_learning
+from brain.db import is_valid_doc_id
 import logging
 import time
+import hashlib
+import re
+import string
+from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 logger = logging.getLogger(__name__)
 
 CELERY_BROKER = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
 celery_app = Celery("tasks", broker=CELERY_BROKER)
+# Job state lives in Firestore and nothing calls .get(), so skip the result backend.
+# Long tasks ack only after finishing and are fetched one at a time, so a killed
+# worker's job is redelivered instead of lost with a prefetched batch.
+celery_app.conf.update(
+    task_ignore_result=True,
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+)
 
 
-@celery_app.task(name='api.tasks.run_learning_job')
-def run_learning_job(job_id: str, mode: str = 'quick'):
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def send_task(name: str, args: list, kwargs: dict = None):
+    """Enqueue a single task by name. Job state lives in Firestore, so no result is stored."""
+    return celery_app.send_task(name, args=args, kwargs=kwargs, ignore_result=True)
+
+
+def bulk_send(tasks: list):
+    """Enqueue several (name, args[, kwargs]) tasks over one pooled broker connection.
+
+    All messages are published through a single producer instead of acquiring
+    a connection per task, which keeps burst enqueues to one broker round-trip each.
+    """
+    with celery_app.producer_or_acquire() as producer:
+        for name, args, *rest in tasks:
+            kwargs = rest[0] if rest else None
+            celery_app.send_task(name, args=args, kwargs=kwargs, producer=producer, ignore_result=True)
+
+
+def _start_job(job_id: str, job_doc: dict = None, **fields):
+    """Mark a job as running and return its doc ref.
+
+    The API writes a 'queued' job doc off the request path and also passes its
+    fields as `job_doc`; they are merged here with the running state in a
+    single set(), so the doc is complete even if the API's write failed.
+    """
     job_ref = db.collection('jobs').document(job_id)
-    job_ref.update({'status': 'running', 'started_at': __import__('datetime').datetime.utcnow().isoformat(), 'progress': 0})
+    job_ref.set({**(job_doc or {}), 'status': 'running', **fields}, merge=True)
+    return job_ref
+
+
+# Progress for the big learning job is flushed to Firestore every N tokens or
+# T seconds, whichever comes first, rather than once per processed token.
+PROGRESS_FLUSH_TOKENS = 50
+PROGRESS_FLUSH_SECONDS = 5.0
+
+# Output-token caps for the per-token Groq calls in the big learning job.
+DEFINITION_MAX_TOKENS = 256
+ENRICHMENT_MAX_TOKENS = 800
+
+# Fixed prompts for the big learning job, built once at import.
+_GENERATOR_SYS = "You are a generator. Produce an unordered list of approximately 1000 unique English words or short phrases (1-3 words each)."
+_GENERATOR_PROMPT = "Generate approximately 1000 unique words or short phrases, separated by commas."
+_EDUCATOR_SYS = "You are an expert educator."
+_ENRICH_SYS = "You are a knowledge graph builder."
+_ENRICH_PROMPT = string.Template(
+    "For the term '$word', return a JSON object with keys: definition (string), related (array of 5 related concepts), examples (array of 2 examples), category (string). Use concise values."
+)
+
+# Separators between generated tokens: commas, newlines and semicolons.
+_TOKEN_SPLIT = re.compile(r'[,\n;]+')
+
+# Concurrent research/enrichment workers per round, and the Groq request rate they share.
+WORD_WORKERS = 8
+GROQ_REQUESTS_PER_SECOND = float(os.environ.get("GROQ_REQUESTS_PER_SECOND", "5"))
+
+# Firestore rejects batches with more than 500 writes.
+FIRESTORE_BATCH_LIMIT = 500
+# Document refs fetched per get_all() call during reconciliation.
+RECONCILE_CHUNK_SIZE = 300
+BATCH_COMMIT_WORKERS = 4
+
+
+def _commit_in_chunks(ops):
+    """Commit a list of (doc_ref, data) set operations as concurrent batches.
+
+    Each batch holds at most FIRESTORE_BATCH_LIMIT writes; commits run on a small
+    thread pool and this call returns once all of them have finished.
+    """
+    batches = []
+    for i in range(0, len(ops), FIRESTORE_BATCH_LIMIT):
+        batch = db.batch()
+        for ref, data in ops[i:i + FIRESTORE_BATCH_LIMIT]:
+            batch.set(ref, data)
+        batches.append(batch)
+    with ThreadPoolExecutor(max_workers=BATCH_COMMIT_WORKERS) as executor:
+        for future in [executor.submit(b.commit) for b in batches]:
+            future.result()
+
+
+def _already_finalized(concept_id: str, content_hash: str) -> bool:
+    """True if the concept is already final in Firestore with the same content.
+
+    Always reads the doc: other writers (the big learning job, batch_enrich)
+    overwrite solidified_knowledge docs without these fields.
+    """
+    try:
+        existing = db.collection('solidified_knowledge').document(concept_id).get()
+    except Exception:
+        return False
+    if not existing.exists:
+        return False
+    data = existing.to_dict() or {}
+    return data.get('status') == 'final' and data.get('content_hash') == content_hash
+
+
+class _TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+@celery_app.task(name='api.tasks.run_learning_job')
+def run_learning_job(job_id: str, mode: str = 'quick', job_doc: dict = None):
+    job_ref = _start_job(job_id, job_doc, started_at=_now(), progress=0)
 
     try:
         if mode == 'deep':
@@ -23,40 +158,220 @@ def run_learning_job(job_id: str, mode: str = 'quick'):
             result = quick_learn_unknowns()
 
         # store result
-        job_ref.update({'status': 'completed', 'progress': 100, 'result': result, 'finished_at': __import__('datetime').datetime.utcnow().isoformat()})
+        job_ref.update({'status': 'completed', 'progress': 100, 'result': result, 'finished_at': _now()})
         return True
     except Exception as e:
         logger.exception(f"Job {job_id} failed: {e}")
-        job_ref.update({'status': 'failed', 'errors': [str(e)], 'finished_at': __import__('datetime').datetime.utcnow().isoformat()})
+        job_ref.update({'status': 'failed', 'errors': [str(e)], 'finished_at': _now()})
         return False
 
 
-@celery_app.task(name='api.tasks.run_big_learning_job')
-def run_big_learning_job(job_id: str):
+# Not idempotent (it generates and learns new words for ten minutes), so it is
+# acked on receipt: a crashed worker's run is dropped rather than re-run.
+@celery_app.task(name='api.tasks.run_big_learning_job', acks_late=False)
+def run_big_learning_job(job_id: str, job_doc: dict = None):
     """Run a raw data training loop up to 10 minutes. Each round:
     - Ask LLM (Groq) to generate ~1000 words
     - Tokenize/split and store tokens to Firestore under collection `raw_training/{job_id}`
     - For new tokens: web-research definitions, avoid duplicates, and perform enrichment
     - Update job progress and stop when 10 minutes elapsed
     """
-    job_ref = db.collection('jobs').document(job_id)
-    job_ref.update({'status': 'running', 'started_at': __import__('datetime').datetime.utcnow().isoformat(), 'progress': 0})
+    job_ref = _start_job(job_id, job_doc, started_at=_now(), progress=0)
 
     start = time.monotonic()
     max_seconds = 10 * 60  # 10 minutes
     round_idx = 0
     total_tokens = 0
 
+    from services.ai_providers import groq_generate_text
+    from services.researcher import quick_research
+    from brain.db import is_known_bulk, add_word
+
+    # keep track of processed tokens across rounds to avoid duplication.
+    # Each processed token is a small doc under raw_training/{job_id}/processed
+    # keyed by its hash, so the job doc never carries the whole set.
+    processed_ref = db.collection('raw_training').document(job_id).collection('processed')
+    try:
+        processed = {d.get('w') for d in processed_ref.stream()}
+    except Exception:
+        processed = set()
+
+    pending_progress = {}
+    unflushed = 0
+    last_flush = time.monotonic()
+
+    groq_limiter = _TokenBucket(GROQ_REQUESTS_PER_SECOND)
+    deadline = threading.Event()
+
+    def process_word(word):
+        """Research, define and enrich one token. Returns None once the time budget is spent."""
+        if deadline.is_set() or time.monotonic() - start >= max_seconds:
+            deadline.set()
+            return None
+
+        # Stage 1/2: quick web research
+        context = quick_research(word)
+
+        explanation = ""
+        if context:
+            # Try to synthesize a concise explanation using Groq
+            try:
+                sys_prompt = f"You are an expert summarizer. Given the following research snippets, produce a concise definition for '{word}'.\n\n{context}"
+                groq_limiter.acquire()
+                explanation = groq_generate_text(sys_prompt, f"Provide a 2-3 sentence definition for: {word}", max_tokens=DEFINITION_MAX_TOKENS)
+            except Exception:
+                explanation = context[:1000]
+        else:
+            # no web context, synthesize directly
+            try:
+                groq_limiter.acquire()
+                explanation = groq_generate_text(_EDUCATOR_SYS, f"Explain '{word}' in 2-3 sentences.", max_tokens=DEFINITION_MAX_TOKENS)
+            except Exception as e:
+                logger.debug(f"Could not synthesize explanation for {word}: {e}")
+                explanation = ""
+
+        enrichment = None
+        if explanation:
+            # Stage 2: add to known words
+            try:
+                add_word(word, explanation, is_known=True)
+            except Exception as e:
+                logger.debug(f"Failed to add word {word}: {e}")
+
+            # Stage 3: multidimensional enrichment via Groq
+            try:
+                groq_limiter.acquire()
+                enrichment = groq_generate_text(_ENRICH_SYS, _ENRICH_PROMPT.substitute(word=word), max_tokens=ENRICHMENT_MAX_TOKENS)
+            except Exception as e:
+                logger.debug(f"Enrichment failed for {word}: {e}")
+
+        return {'word': word, 'enrichment': enrichment}
+
+    try:
+        while True:
+            elapsed = time.monotonic() - start
+            if elapsed >= max_seconds:
+                logger.info(f"Big job {job_id}: time limit reached ({elapsed:.1f}s). Stopping")
+                break
+
+            round_idx += 1
+            logger.info(f"Big job {job_id}: starting round {round_idx}")
+
+            # Request LLM to generate ~1000 words in plain text (comma/newline separated)
+            try:
+                generated = groq_generate_text(_GENERATOR_SYS, _GENERATOR_PROMPT)
+            except Exception as e:
+                logger.exception(f"Big job {job_id}: generation failed: {e}")
+                job_ref.update({'errors': [str(e)]})
+                break
+
+            if not generated or len(generated.strip()) == 0:
+                logger.warning(f"Big job {job_id}: empty generation on round {round_idx}")
+                time.sleep(1)
+                continue
+
+            # Tokenize: split on separators in one pass, dropping empty tokens
+            candidates = [c for c in (t.strip() for t in _TOKEN_SPLIT.split(generated)) if c]
+
+            # filter new candidates: not already processed and not known
+            unique = [c for c in dict.fromkeys(candidates) if c.lower() not in processed]
+            known = is_known_bulk(unique)
+            new_candidates = []
+            newly_processed = []
+            for cand in unique:
+                key = cand.lower()
+                if key in processed:
+                    continue
+                processed.add(key)
+                newly_processed.append(key)
+                if cand in known:
+                    continue
+                new_candidates.append(cand)
+
+            # persist raw tokens for audit, together with this round's processed markers
+            collection_ref = db.collection('raw_training').document(job_id).collection('rounds')
+            created_at = _now()
+            ops = [
+                (collection_ref.document(), {'token': cand, 'round': round_idx, 'index': i, 'created_at': created_at})
+                for i, cand in enumerate(candidates)
+            ]
+            for key in newly_processed:
+                digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+                ops.append((processed_ref.document(digest), {'w': key}))
+            _commit_in_chunks(ops)
+
+            # Process a bounded number per round to control time
+            max_process = 200
+            to_process = new_candidates[:max_process]
+
+            # Research + enrich new candidates concurrently; enrichment docs are
+            # collected and written in one batched commit at the end of the round.
+            enrich_ops = []
+            with ThreadPoolExecutor(max_workers=WORD_WORKERS) as executor:
+                futures = {executor.submit(process_word, word): word for word in to_process}
+                for future in as_completed(futures):
+                    word = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.exception(f"Error processing token {word}: {e}")
+                        job_ref.update({'errors': [str(e)]})
+                        continue
+                    if result is None:
+                        continue
+                    if result.get('enrichment') is not None:
+                        # Generated tokens like "TCP/IP" aren't valid doc ids; one bad ref
+                        # must not fail the job or the 500-op batch it would land in.
+                        if not is_valid_doc_id(word):
+                            logger.debug(f"Skipping enrichment for invalid doc id: {word!r}")
+                        else:
+                            try:
+                                enrich_ops.append((db.collection('solidified_knowledge').document(word), {
+                                    'enrichment': result['enrichment'],
+                                    'source': 'groq',
+                                    'created_at': _now()
+                                }))
+                            except Exception as e:
+                                logger.debug(f"Could not build enrichment ref for {word}: {e}")
+
+                    # buffer progress locally; flush every N tokens or T seconds
+                    total_tokens += 1
+                    unflushed += 1
+                    progress = min(99, int(((time.monotonic() - start) / max_seconds) * 100))
+                    pending_progress = {'progress': progress, 'last_round': round_idx, 'total_tokens': total_tokens}
+                    if unflushed >= PROGRESS_FLUSH_TOKENS or time.monotonic() - last_flush >= PROGRESS_FLUSH_SECONDS:
+                        job_ref.update(pending_progress)
+                        pending_progress = {}
+                        unflushed = 0
+                        last_flush = time.monotonic()
+
+            if deadline.is_set():
+                logger.info(f"Big job {job_id}: reached time limit during processing")
+            if enrich_ops:
+                _commit_in_chunks(enrich_ops)
+
+            # brief pause
+            time.sleep(0.5)
+
+        # finalize job (also flushes any buffered progress)
+        job_ref.update({**pending_progress, 'status': 'completed', 'progress': 100, 'rounds': round_idx, 'total_tokens': total_tokens, 'finished_at': _now()})
+        return True
+
+    except Exception as e:
+        logger.exception(f"Big job {job_id} failed: {e}")
+        job_ref.update({'status': 'failed', 'errors': [str(e)], 'finished_at': _now()})
+        return False
+
+
 @celery_app.task(name='api.tasks.finalize_concept')
-def finalize_concept(concept_id: str, job_id: str = None):
+def finalize_concept(concept_id: str, job_id: str = None, job_doc: dict = None):
     """Finalize a concept: read from Neo4j (if available), write canonical doc to Firestore,
     and mark the Neo4j node as finalized.
     """
     job_ref = None
     try:
         if job_id:
-            job_ref = db.collection('jobs').document(job_id)
-            job_ref.update({'status': 'running', 'progress': 0})
+            job_ref = _start_job(job_id, job_doc, progress=0)
     except Exception:
         job_ref = None
 
@@ -74,21 +389,36 @@ def finalize_concept(concept_id: str, job_id: str = None):
         category = (node.get('category') if node else 'unknown')
         definition = (node.get('definition') if node else '')
 
+        # Skip the Firestore/embedding/Neo4j writes if nothing changed since the last finalize
+        content_hash = hashlib.sha1(f"{label}\x1f{category}\x1f{definition or ''}".encode('utf-8')).hexdigest()
+        if _already_finalized(concept_id, content_hash):
+            if job_ref:
+                try:
+                    job_ref.update({'status': 'completed', 'progress': 100, 'skipped': 'unchanged'})
+                except Exception:
+                    pass
+            return True
+
+        # content_hash is what lets a later finalize skip; it is only written once
+        # the Neo4j update below has succeeded too.
         doc = {
             'id': concept_id,
             'label': label,
             'category': category,
             'definition': definition,
             'status': 'final',
-            'finalized_at': __import__('datetime').datetime.utcnow().isoformat(),
+            'finalized_at': _now(),
             'source': 'finalize_task'
         }
 
         # write to Firestore
+        doc_ref = db.collection('solidified_knowledge').document(concept_id)
+        firestore_ok = False
         try:
-            db.collection('solidified_knowledge').document(concept_id).set(doc)
-        except Exception:
-            pass
+            doc_ref.set(doc)
+            firestore_ok = True
+        except Exception as e:
+            logger.warning(f"Finalize {concept_id}: Firestore write failed: {e}")
 
         # compute and store embedding in Chroma (if available)
         try:
@@ -100,12 +430,19 @@ def finalize_concept(concept_id: str, job_id: str = None):
             pass
 
         # update Neo4j node status
+        neo4j_ok = False
         try:
-            if 'update_node_status' in globals() or True:
-                from services.neo4j_helper import update_node_status as _uns
-                _uns(concept_id, {'status': 'final', 'finalized_at': __import__('datetime').datetime.utcnow().isoformat()})
-        except Exception:
-            pass
+            from services.neo4j_helper import update_node_status
+            update_node_status(concept_id, {'status': 'final', 'finalized_at': _now()})
+            neo4j_ok = True
+        except Exception as e:
+            logger.warning(f"Finalize {concept_id}: Neo4j status update failed: {e}")
+
+        if firestore_ok and neo4j_ok:
+            try:
+                doc_ref.update({'content_hash': content_hash})
+            except Exception:
+                pass
 
         if job_ref:
             try:
@@ -123,17 +460,17 @@ def finalize_concept(concept_id: str, job_id: str = None):
 
 
 @celery_app.task(name='api.tasks.reconcile_neo4j_firestore')
-def reconcile_neo4j_firestore(job_id: str = None, status: str = 'final'):
+def reconcile_neo4j_firestore(job_id: str = None, status: str = 'final', job_doc: dict = None):
     """Compare Neo4j nodes with Firestore canonical docs and write a reconciliation report.
 
     The task will scan Neo4j nodes with `status` and check existence in Firestore.
-    Results are written to `jobs/{job_id}/reconcile_report` as a small summary.
+    Results are written to `jobs/{job_id}/reconcile_report` as a small summary
+    and returned.
     """
     job_ref = None
     try:
         if job_id:
-            job_ref = db.collection('jobs').document(job_id)
-            job_ref.update({'status': 'running', 'progress': 0})
+            job_ref = _start_job(job_id, job_doc, progress=0)
     except Exception:
         job_ref = None
 
@@ -143,18 +480,19 @@ def reconcile_neo4j_firestore(job_id: str = None, status: str = 'final'):
         missing = []
         total = len(nodes)
         checked = 0
-        for n in nodes:
-            checked += 1
-            cid = n.get('id')
+        collection = db.collection('solidified_knowledge')
+        ids = [n.get('id') for n in nodes]
+        for i in range(0, total, RECONCILE_CHUNK_SIZE):
+            chunk = ids[i:i + RECONCILE_CHUNK_SIZE]
             try:
-                doc = db.collection('solidified_knowledge').document(cid).get()
-                if not doc.exists:
-                    missing.append(cid)
+                found = {snap.id for snap in db.get_all([collection.document(cid) for cid in chunk]) if snap.exists}
+                missing.extend(cid for cid in chunk if cid not in found)
             except Exception:
                 # assume missing if Firestore not available
-                missing.append(cid)
+                missing.extend(chunk)
+            checked += len(chunk)
 
-            if job_ref and checked % 100 == 0:
+            if job_ref:
                 try:
                     job_ref.update({'progress': int((checked/total)*100), 'checked': checked})
                 except Exception:
@@ -175,139 +513,3 @@ def reconcile_neo4j_firestore(job_id: str = None, status: str = 'final'):
             except Exception:
                 pass
         raise
-
-    from services.ai_providers import groq_generate_text
-    from services.researcher import quick_research
-    from brain.db import is_known, add_word
-
-    # keep track of processed tokens across rounds to avoid duplication
-    job_doc = job_ref.get().to_dict()
-    processed = set(job_doc.get('processed_tokens', [])) if job_doc else set()
-
-    try:
-        while True:
-            elapsed = time.monotonic() - start
-            if elapsed >= max_seconds:
-                logger.info(f"Big job {job_id}: time limit reached ({elapsed:.1f}s). Stopping")
-                break
-
-            round_idx += 1
-            logger.info(f"Big job {job_id}: starting round {round_idx}")
-
-            # Request LLM to generate ~1000 words in plain text (comma/newline separated)
-            system_prompt = "You are a generator. Produce an unordered list of approximately 1000 unique English words or short phrases (1-3 words each)."
-            prompt = "Generate approximately 1000 unique words or short phrases, separated by commas."
-
-            try:
-                generated = groq_generate_text(system_prompt, prompt)
-            except Exception as e:
-                logger.exception(f"Big job {job_id}: generation failed: {e}")
-                job_ref.update({'errors': [str(e)]})
-                break
-
-            if not generated or len(generated.strip()) == 0:
-                logger.warning(f"Big job {job_id}: empty generation on round {round_idx}")
-                time.sleep(1)
-                continue
-
-            # Tokenize: normalize and split
-            raw = generated.replace('\n', ',')
-            candidates = [c.strip() for c in raw.split(',') if c.strip()]
-
-            # persist raw tokens for audit
-            batch = db.batch()
-            collection_ref = db.collection('raw_training').document(job_id).collection('rounds')
-            for i, cand in enumerate(candidates):
-                doc_id = f"r{round_idx}_t{i}"
-                batch.set(collection_ref.document(doc_id), {
-                    'token': cand,
-                    'round': round_idx,
-                    'created_at': __import__('datetime').datetime.utcnow().isoformat()
-                })
-            batch.commit()
-
-            # filter new candidates: not already processed and not known
-            new_candidates = []
-            for cand in candidates:
-                key = cand.lower()
-                if key in processed:
-                    continue
-                if is_known(cand):
-                    processed.add(key)
-                    continue
-                processed.add(key)
-                new_candidates.append(cand)
-
-            # Process a bounded number per round to control time
-            max_process = 200
-            to_process = new_candidates[:max_process]
-
-            # For each new candidate: research definition then enrich via Groq
-            for idx, word in enumerate(to_process):
-                # Check elapsed time frequently
-                if time.monotonic() - start >= max_seconds:
-                    logger.info(f"Big job {job_id}: reached time limit during processing")
-                    break
-
-                try:
-                    # Stage 1/2: quick web research
-                    context = quick_research(word)
-
-                    explanation = ""
-                    if context:
-                        # Try to synthesize a concise explanation using Groq
-                        try:
-                            sys_prompt = f"You are an expert summarizer. Given the following research snippets, produce a concise definition for '{word}'.\n\n{context}"
-                            explanation = groq_generate_text(sys_prompt, f"Provide a 2-3 sentence definition for: {word}")
-                        except Exception:
-                            explanation = context[:1000]
-                    else:
-                        # no web context, synthesize directly
-                        try:
-                            explanation = groq_generate_text("You are an expert educator.", f"Explain '{word}' in 2-3 sentences.")
-                        except Exception as e:
-                            logger.debug(f"Could not synthesize explanation for {word}: {e}")
-                            explanation = ""
-
-                    if explanation:
-                        # Stage 2: add to known words
-                        try:
-                            add_word(word, explanation, is_known=True)
-                        except Exception as e:
-                            logger.debug(f"Failed to add word {word}: {e}")
-
-                        # Stage 3: multidimensional enrichment via Groq
-                        try:
-                            enrich_prompt = (
-                                f"For the term '{word}', return a JSON object with keys: definition (string), related (array of 5 related concepts), examples (array of 2 examples), category (string). Use concise values."
-                            )
-                            enrichment = groq_generate_text("You are a knowledge graph builder.", enrich_prompt)
-                            # store raw enrichment under solidified_knowledge
-                            db.collection('solidified_knowledge').document(word).set({
-                                'enrichment': enrichment,
-                                'source': 'groq',
-                                'created_at': __import__('datetime').datetime.utcnow().isoformat()
-                            })
-                        except Exception as e:
-                            logger.debug(f"Enrichment failed for {word}: {e}")
-
-                    # update progress per processed token
-                    total_tokens += 1
-                    progress = min(99, int(((time.monotonic() - start) / max_seconds) * 100))
-                    job_ref.update({'progress': progress, 'last_round': round_idx, 'total_tokens': total_tokens, 'processed_tokens': list(processed)})
-
-                except Exception as e:
-                    logger.exception(f"Error processing token {word}: {e}")
-                    job_ref.update({'errors': [str(e)]})
-
-            # brief pause
-            time.sleep(0.5)
-
-        # finalize job
-        job_ref.update({'status': 'completed', 'progress': 100, 'rounds': round_idx, 'total_tokens': total_tokens, 'finished_at': __import__('datetime').datetime.utcnow().isoformat()})
-        return True
-
-    except Exception as e:
-        logger.exception(f"Big job {job_id} failed: {e}")
-        job_ref.update({'status': 'failed', 'errors': [str(e)], 'finished_at': __import__('datetime').datetime.utcnow().isoformat()})
-        return False
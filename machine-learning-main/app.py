@@ -1,7 +1,7 @@
 import streamlit as st
+import pandas as pd
 import time
 import logging
-import uuid
 from datetime import datetime, timedelta
 
 # Import services from the services layer
@@ -17,7 +17,7 @@ from logic.rethink import rethink_and_learn
 from brain.knowledge_base import generate_response_from_knowledge
 
 # Import advanced learning
-from logic.advanced_learning import quick_learn_unknowns, deep_learning, LEARNING_INTERVAL
+from logic.advanced_learning import quick_learn_unknowns, deep_learning, start_learning_scheduler, get_learning_schedule, LEARNING_INTERVAL
 
 logging.basicConfig(level=APP_CONFIG.LOG_LEVEL)
 logger = logging.getLogger(__name__)
@@ -26,31 +26,116 @@ st.set_page_config(page_title="Project Seedling v2", layout="centered")
 st.title("Project Seedling v2")
 
 # Initialize session state for learning tracking
-if "learning_last_run" not in st.session_state:
-    st.session_state.learning_last_run = None
 if "learning_status" not in st.session_state:
     st.session_state.learning_status = None
 if "auto_refresh" not in st.session_state:
     st.session_state.auto_refresh = True
 
+
+def _s(ok, on='✅ Online', off='❌ Offline'):
+    return on if ok else off
+
+
+class ThrottledWriter:
+    """Buffers streamed text deltas and re-renders the placeholder at a bounded rate.
+
+    Re-rendering on every token is what makes streamed chat output crawl, so the
+    placeholder is only updated once `min_ms` has passed or `min_chars` are pending.
+    """
+
+    def __init__(self, placeholder, min_ms: int = 50, min_chars: int = 8):
+        self.placeholder = placeholder
+        self.min_interval = min_ms / 1000.0
+        self.min_chars = min_chars
+        self.buf = ""
+        self._pending = 0
+        self._last_flush = 0.0
+
+    def write(self, delta: str):
+        if not delta:
+            return
+        self.buf += delta
+        self._pending += len(delta)
+        if self._pending >= self.min_chars or time.monotonic() - self._last_flush >= self.min_interval:
+            self.flush()
+
+    def flush(self):
+        self.placeholder.markdown(self.buf)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+
+# Sidebar data is cached briefly so reruns don't re-query Firestore every time.
+@st.cache_data(ttl=60, show_spinner=False)
+def _health_status():
+    return get_health_status()
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_bootstrap_stats():
+    from scripts.seed_knowledge import get_bootstrap_stats
+    return get_bootstrap_stats(db)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_review_candidates():
+    review_docs = db.collection('needs_review').order_by('timestamp', direction='DESCENDING').limit(1).stream()
+    review_entries = list(review_docs)
+    if not review_entries:
+        return None
+    return review_entries[0].to_dict().get('candidates', [])
+
+
+@st.fragment(run_every=1)
+def _countdown_fragment():
+    """Re-renders only the learning countdown each second instead of the whole script."""
+    schedule = get_learning_schedule()
+    if schedule["next_run"]:
+        remaining = max(0, schedule["next_run"] - time.time())
+        countdown_secs = int(remaining)
+        progress = min(1.0, 1.0 - (remaining / LEARNING_INTERVAL))
+    else:
+        # Not started yet, or a cycle is running right now
+        countdown_secs = 0
+        progress = 1.0
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.metric("Next Quick Learn", f"{countdown_secs}s", delta=f"/{LEARNING_INTERVAL}s")
+    with col2:
+        st.progress(progress, text="Learning cycle")
+
+    # When a scheduled cycle learns something, rerun the full app so the status panel shows it
+    last = schedule["last_result"]
+    if last is not None and last is not st.session_state.get("seen_learning_result"):
+        st.session_state.seen_learning_result = last
+        if last.get("status") == "completed" and last.get("learned_count", 0) > 0:
+            st.session_state.learning_status = last
+            if st.session_state.auto_refresh:
+                st.rerun(scope="app")
+
+
 # --- Sidebar --- 
 with st.sidebar:
     st.header("AI Teacher Preview")
-    health = get_health_status()
+    if st.button("🔄 Refresh status", help="Re-check service health"):
+        _health_status.clear()
+    health = _health_status()
 
     # Show debug info if enabled
     if APP_CONFIG.LOG_LEVEL == "DEBUG" or not health["all_services_ok"]:
-        st.write("**System Status:**")
-        st.write(f"- Firebase: {'✅ Online' if health['firebase']['online'] else '❌ Offline'}")
-        st.write(f"- spaCy NLP: {'✅ Online' if health['spacy']['online'] else '❌ Offline'}")
-        st.write(f"- Gemini API: {'✅ Ready' if health['gemini']['configured'] else '⚠️ Not configured'}")
-        st.write(f"- Groq API: {'✅ Ready' if health['groq']['configured'] else '⚠️ Not configured'}")
+        st.markdown("\n".join([
+            "**System Status:**",
+            f"- Firebase: {_s(health['firebase']['online'])}",
+            f"- spaCy NLP: {_s(health['spacy']['online'])}",
+            f"- Gemini API: {_s(health['gemini']['configured'], '✅ Ready', '⚠️ Not configured')}",
+            f"- Groq API: {_s(health['groq']['configured'], '✅ Ready', '⚠️ Not configured')}",
+        ]))
 
     # Show knowledge base stats if services are online
     if health['all_services_ok']:
         try:
-            from scripts.seed_knowledge import get_bootstrap_stats
-            stats = get_bootstrap_stats(db)
+            stats = _load_bootstrap_stats()
             if stats:
                 st.markdown("---")
                 st.subheader("📚 Knowledge Base")
@@ -65,24 +150,8 @@ with st.sidebar:
     st.markdown("---")
     st.subheader("🧠 Learning Control")
     
-    # Calculate time until next learning
-    if st.session_state.learning_last_run:
-        elapsed = time.time() - st.session_state.learning_last_run
-        remaining = max(0, LEARNING_INTERVAL - elapsed)
-        countdown_secs = int(remaining)
-        progress = min(1.0, 1.0 - (remaining / LEARNING_INTERVAL))
-    else:
-        countdown_secs = LEARNING_INTERVAL
-        progress = 0.0
-    
     # Display countdown
-    countdown_placeholder = st.empty()
-    with countdown_placeholder.container():
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            st.metric("Next Quick Learn", f"{countdown_secs}s", delta=f"/{LEARNING_INTERVAL}s")
-        with col2:
-            st.progress(progress, text="Learning cycle")
+    _countdown_fragment()
     
     # Learning status
     if st.session_state.learning_status:
@@ -112,7 +181,6 @@ with st.sidebar:
             with st.spinner("Quick learning in progress..."):
                 result = quick_learn_unknowns()
                 st.session_state.learning_status = result
-                st.session_state.learning_last_run = time.time()
                 st.toast(f"✅ Learned {result.get('learned_count', 0)} concepts!", icon="🚀")
                 st.rerun()
     
@@ -121,7 +189,6 @@ with st.sidebar:
             with st.spinner("Deep learning in progress..."):
                 result = deep_learning()
                 st.session_state.learning_status = result
-                st.session_state.learning_last_run = time.time()
                 learned = result.get('learned_unknown', 0)
                 deepened = result.get('deepened_known', 0)
                 st.toast(f"✅ Learned {learned} unknowns, deepened {deepened} concepts!", icon="🧠")
@@ -133,33 +200,52 @@ with st.sidebar:
     
     try:
         # Fetch recent candidates from needs_review collection
-        review_docs = db.collection('needs_review').order_by('timestamp', direction='DESCENDING').limit(1).stream()
-        review_entries = list(review_docs)
+        candidates = _load_review_candidates()
         
-        if review_entries:
-            latest_review = review_entries[0].to_dict()
-            candidates = latest_review.get('candidates', [])
-            
+        if candidates is not None:
             if candidates:
                 st.write(f"**Candidates to learn** ({len(candidates)}):")
-                for i, cand in enumerate(candidates[:5]):  # Show top 5
-                    col_cand, col_approve, col_reject = st.columns([3, 1, 1])
-                    with col_cand:
-                        st.write(f"• {cand}")
-                    with col_approve:
-                        if st.button("✅", key=f"approve_{i}_{cand}", help="Approve and learn"):
-                            # Candidate already in unknown_words, will be learned on next cycle
-                            st.toast(f"✅ {cand} approved!", icon="👍")
-                    with col_reject:
-                        if st.button("❌", key=f"reject_{i}_{cand}", help="Reject/skip"):
+                shown = candidates[:5]  # Show top 5
+                # One batched lookup up front; already-known candidates have nothing to review
+                try:
+                    from brain.db import are_known
+                    known_map = are_known(shown)
+                except Exception:
+                    known_map = {}
+                shown = [cand for cand in shown if not known_map.get(cand, False)]
+                # One grid widget instead of a row of columns + two buttons per candidate
+                with st.form("review_candidates", border=False):
+                    edited = st.data_editor(
+                        pd.DataFrame({"candidate": shown, "approve": False, "reject": False}),
+                        column_config={
+                            "candidate": st.column_config.TextColumn("Candidate", disabled=True),
+                            "approve": st.column_config.CheckboxColumn("✅", help="Approve and learn"),
+                            "reject": st.column_config.CheckboxColumn("❌", help="Reject/skip"),
+                        },
+                        hide_index=True,
+                        use_container_width=True,
+                    )
+                    submitted = st.form_submit_button("Apply")
+                if submitted:
+                    acted = False
+                    for row in edited.itertuples(index=False):
+                        cand = row.candidate
+                        if row.reject:
                             # Remove from unknown_words
                             try:
-                                from brain.db import is_known
-                                if not is_known(cand):
-                                    db.collection('unknown_words').document(cand).delete()
-                                    st.toast(f"❌ {cand} rejected!", icon="🚫")
+                                db.collection('unknown_words').document(cand).delete()
+                                st.toast(f"❌ {cand} rejected!", icon="🚫")
+                                acted = True
                             except Exception as e:
                                 logger.debug(f"Error rejecting {cand}: {e}")
+                        elif row.approve:
+                            # Candidate already in unknown_words, will be learned on next cycle
+                            st.toast(f"✅ {cand} approved!", icon="👍")
+                            acted = True
+                    if acted:
+                        # Show the list as it is after this review, not the cached one
+                        _load_review_candidates.clear()
+                        st.rerun()
             else:
                 st.info("No candidate unknowns pending review.")
         else:
@@ -170,27 +256,32 @@ with st.sidebar:
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
+# (role, content) pairs kept in step with messages so the context isn't rebuilt each turn
+if "context_tuples" not in st.session_state:
+    st.session_state.context_tuples = [(m["role"], m["content"]) for m in st.session_state.messages]
+# message id -> position in messages, for O(1) lookups from feedback/rethink
+if "msg_index" not in st.session_state:
+    st.session_state.msg_index = {m["id"]: i for i, m in enumerate(st.session_state.messages)}
+# Message ids never leave the session, so a per-session counter is enough
+if "next_msg_id" not in st.session_state:
+    st.session_state.next_msg_id = 0
 
-# --- Automatic Learning Loop ---
-# Check if it's time to run quick learning
-if st.session_state.learning_last_run is None or (time.time() - st.session_state.learning_last_run) >= LEARNING_INTERVAL:
-    try:
-        result = quick_learn_unknowns()
-        if result["status"] == "completed" and result["learned_count"] > 0:
-            st.session_state.learning_status = result
-            st.session_state.learning_last_run = time.time()
-            logger.info(f"🚀 Automatic quick learning triggered: {result['learned_count']} concepts learned")
-    except Exception as e:
-        logger.error(f"Error in automatic learning: {e}")
 
-# --- Auto-refresh to update countdown every second ---
-if st.session_state.auto_refresh:
-    try:
-        time.sleep(1)
-        st.experimental_rerun()
-    except Exception:
-        # If rerun fails for any reason, do not crash the app
-        pass
+def _new_msg_id() -> int:
+    msg_id = st.session_state.next_msg_id
+    st.session_state.next_msg_id = msg_id + 1
+    return msg_id
+
+
+def _append_message(message: dict):
+    st.session_state.messages.append(message)
+    st.session_state.context_tuples.append((message["role"], message["content"]))
+    st.session_state.msg_index[message["id"]] = len(st.session_state.messages) - 1
+
+# --- Automatic Learning Loop ---
+# Quick learning runs every LEARNING_INTERVAL seconds on the background loop,
+# independent of reruns; this only starts it the first time.
+start_learning_scheduler()
 
 # --- Functions for handling user feedback ---
 def handle_feedback(message_id, is_correct):
@@ -199,25 +290,36 @@ def handle_feedback(message_id, is_correct):
         # In a real app, you might log this to improve the model
     else:
         st.session_state.rethinking = {"message_id": message_id}
-        st.rerun()
+        # Callbacks can't rerun the app themselves; the message fragment escalates on this flag
+        st.session_state._rethink_requested = True
 
 # -- Main chat display and interaction
-for idx, message in enumerate(st.session_state.messages):
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
-        # Add feedback buttons for assistant messages
-        if message["role"] == "assistant" and "rethink_of" not in message:
-            col1, col2 = st.columns([1, 10])
-            with col1:
-                st.button("👍", key=f"good_{message['id']}", on_click=handle_feedback, args=(message['id'], True))
-            with col2:
-                st.button("👎", key=f"bad_{message['id']}", on_click=handle_feedback, args=(message['id'], False))
+@st.fragment
+def _render_messages():
+    """Renders the chat history; feedback clicks rerun only this fragment, not the whole script."""
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+            # Add feedback buttons for assistant messages
+            if message["role"] == "assistant" and "rethink_of" not in message:
+                col1, col2 = st.columns([1, 10])
+                with col1:
+                    st.button("👍", key=f"good_{message['id']}", on_click=handle_feedback, args=(message['id'], True))
+                with col2:
+                    st.button("👎", key=f"bad_{message['id']}", on_click=handle_feedback, args=(message['id'], False))
+
+    # A 👎 needs the app-level rethink handler below, so escalate to a full rerun
+    if st.session_state.pop("_rethink_requested", False):
+        st.rerun(scope="app")
+
+
+_render_messages()
 
 # Handle the user's prompt
 if prompt := st.chat_input("Ask a question..."):
-    new_message_id = str(uuid.uuid4())
+    new_message_id = _new_msg_id()
     new_message = {"role": "user", "content": prompt, "id": new_message_id}
-    st.session_state.messages.append(new_message)
+    _append_message(new_message)
     with st.chat_message("user"):
         st.markdown(prompt)
 
@@ -226,27 +328,25 @@ if prompt := st.chat_input("Ask a question..."):
         thinking_placeholder.markdown("🧠 _Thinking..._")
         
         try:
-            conversation_context = [
-                (msg["role"], msg["content"])
-                for msg in st.session_state.messages[:-1]
-            ]
+            # Everything but the current turn
+            conversation_context = st.session_state.context_tuples[:-1]
             
-            response_data = generate_response_from_knowledge(
+            writer = ThrottledWriter(thinking_placeholder)
+            for delta in generate_response_from_knowledge(
                 prompt, 
                 conversation_context=conversation_context
-            )
-            answer = response_data.get("synthesized_answer")
-            
-            thinking_placeholder.empty()
-            st.markdown(answer)
+            ):
+                writer.write(delta)
+            writer.flush()
+            answer = writer.buf
             # Store the original prompt ID so we can trace back to what question this answers
             new_message = {
                 "role": "assistant", 
                 "content": answer, 
-                "id": str(uuid.uuid4()),
+                "id": _new_msg_id(),
                 "original_prompt_id": new_message_id
             }
-            st.session_state.messages.append(new_message)
+            _append_message(new_message)
 
         except Exception as e:
             logger.error(f"Error in generate_response: {e}", exc_info=True)
@@ -256,10 +356,10 @@ if prompt := st.chat_input("Ask a question..."):
             new_message = {
                 "role": "assistant", 
                 "content": answer, 
-                "id": str(uuid.uuid4()),
+                "id": _new_msg_id(),
                 "original_prompt_id": new_message_id
             }
-            st.session_state.messages.append(new_message)
+            _append_message(new_message)
 
 # Handle the rethinking process
 if st.session_state.get("rethinking"):
@@ -270,17 +370,14 @@ if st.session_state.get("rethinking"):
     original_prompt = None
     bad_answer = None
     
-    for msg in st.session_state.messages:
-        if msg.get('id') == message_id_to_rethink and msg.get('role') == 'assistant':
-            assistant_msg = msg
-            bad_answer = msg.get('content')
-            # Find the original prompt using the stored reference
-            original_prompt_id = msg.get('original_prompt_id')
-            for user_msg in st.session_state.messages:
-                if user_msg.get('id') == original_prompt_id:
-                    original_prompt = user_msg.get('content')
-                    break
-            break
+    idx = st.session_state.msg_index.get(message_id_to_rethink)
+    if idx is not None and st.session_state.messages[idx].get('role') == 'assistant':
+        assistant_msg = st.session_state.messages[idx]
+        bad_answer = assistant_msg.get('content')
+        # Find the original prompt using the stored reference
+        orig_idx = st.session_state.msg_index.get(assistant_msg.get('original_prompt_id'))
+        if orig_idx is not None:
+            original_prompt = st.session_state.messages[orig_idx].get('content')
 
     if original_prompt and bad_answer:
         st.session_state.rethinking = None # Reset the state
@@ -294,10 +391,10 @@ if st.session_state.get("rethinking"):
                 rethink_placeholder.empty()
                 st.markdown(new_answer)
                 # Add the new answer as a new message, noting it's a correction
-                st.session_state.messages.append({
+                _append_message({
                     "role": "assistant", 
                     "content": new_answer, 
-                    "id": str(uuid.uuid4()),
+                    "id": _new_msg_id(),
                     "rethink_of": message_id_to_rethink,
                     "original_prompt_id": assistant_msg.get('original_prompt_id')
                 })
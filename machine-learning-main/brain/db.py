@@ -1,22 +1,152 @@
 # brain/db.py
+import asyncio
 import logging
+import re
+import threading
+import time
 from datetime import datetime
-from services.services import db
+from services.services import db, adb
 
 logger = logging.getLogger(__name__)
 
 KNOWN_WORDS_COLLECTION = "known_words"
 UNKNOWN_WORDS_COLLECTION = "unknown_words"
 
-def is_known(word: str) -> bool:
-    """Checks if a word is in the known_words collection."""
+# Max document refs per batched get_all() call.
+GET_ALL_CHUNK_SIZE = 100
+# Firestore caps a WriteBatch at 500 operations; stay under it with headroom.
+WRITE_BATCH_MAX_OPS = 450
+
+# Firestore document ids are at most 1500 bytes of UTF-8 and cannot contain
+# '/', be '.' or '..', or match the reserved __.*__ form.
+MAX_DOC_ID_BYTES = 1500
+_RESERVED_DOC_ID = re.compile(r'__.*__', re.DOTALL)
+
+# Known-status lookups are cached per process: word -> (known, expires_at).
+KNOWN_CACHE_TTL = 300.0
+KNOWN_CACHE_MAX = 8192
+_known_cache = {}
+_known_cache_lock = threading.Lock()
+
+# Words this process has seen confirmed as known. Words are never removed from
+# known_words, so membership is answered as known without a read and never goes
+# stale. Absence proves nothing -- other processes promote words too -- so
+# misses still go to Firestore. Filled from lookups and promotions only; an
+# insertion-ordered dict keeps it bounded by evicting the oldest entries.
+CONFIRMED_KNOWN_MAX = 100_000
+_confirmed_known = {}
+
+def is_valid_doc_id(doc_id) -> bool:
+    """True if `doc_id` is a string Firestore accepts as a document id."""
+    if not isinstance(doc_id, str) or not doc_id or '/' in doc_id or doc_id in ('.', '..'):
+        return False
+    if _RESERVED_DOC_ID.fullmatch(doc_id):
+        return False
     try:
-        doc_ref = db.collection(KNOWN_WORDS_COLLECTION).document(word)
-        return doc_ref.get().exists
-    except Exception as e:
-        logger.error(f"Error checking if word '{word}' is known: {e}", exc_info=True)
+        return len(doc_id.encode('utf-8')) <= MAX_DOC_ID_BYTES
+    except UnicodeEncodeError:  # lone surrogates
         return False
 
+def _cache_known(word: str, known: bool):
+    with _known_cache_lock:
+        if len(_known_cache) >= KNOWN_CACHE_MAX and word not in _known_cache:
+            _known_cache.pop(next(iter(_known_cache)))
+        _known_cache[word] = (known, time.monotonic() + KNOWN_CACHE_TTL)
+        if known and word not in _confirmed_known:
+            if len(_confirmed_known) >= CONFIRMED_KNOWN_MAX:
+                _confirmed_known.pop(next(iter(_confirmed_known)))
+            _confirmed_known[word] = None
+
+def _invalidate_known(word: str):
+    with _known_cache_lock:
+        _known_cache.pop(word, None)
+
+def _split_cached(words: list):
+    """Returns a `{word: bool}` dict prefilled from the cache, plus the words still to fetch."""
+    result = {w: False for w in words}
+    now = time.monotonic()
+    misses = []
+    with _known_cache_lock:
+        for w in result:
+            # Words that aren't valid document ids can never be known.
+            if not is_valid_doc_id(w):
+                continue
+            if w in _confirmed_known:
+                result[w] = True
+                continue
+            cached = _known_cache.get(w)
+            if cached and cached[1] > now:
+                result[w] = cached[0]
+            else:
+                misses.append(w)
+    return result, misses
+
+def are_known(words: list) -> dict:
+    """Checks several words against the known_words collection at once.
+
+    Fresh cached answers are used as-is; the rest are fetched with one batched
+    `get_all` per chunk of words. Returns a `{word: bool}` dict covering every input word;
+    words in a chunk whose read fails are reported unknown.
+    """
+    result, misses = _split_cached(words)
+    collection = db.collection(KNOWN_WORDS_COLLECTION)
+    for i in range(0, len(misses), GET_ALL_CHUNK_SIZE):
+        chunk = misses[i:i + GET_ALL_CHUNK_SIZE]
+        try:
+            for snap in db.get_all([collection.document(w) for w in chunk]):
+                result[snap.id] = snap.exists
+                _cache_known(snap.id, snap.exists)
+        except Exception as e:
+            logger.error(f"Error checking {len(chunk)} known words in bulk: {e}", exc_info=True)
+    return result
+
+async def are_known_async(words: list) -> dict:
+    """Async `are_known`: fetches every chunk of cache misses concurrently.
+
+    Uses the async Firestore client, so it must run on the brain.scheduler loop.
+    """
+    if adb is None:
+        return await asyncio.to_thread(are_known, words)
+    result, misses = _split_cached(words)
+    collection = adb.collection(KNOWN_WORDS_COLLECTION)
+
+    async def fetch(chunk):
+        return [snap async for snap in adb.get_all([collection.document(w) for w in chunk])]
+
+    chunks = await asyncio.gather(*(fetch(misses[i:i + GET_ALL_CHUNK_SIZE])
+                                    for i in range(0, len(misses), GET_ALL_CHUNK_SIZE)),
+                                  return_exceptions=True)
+    for snaps in chunks:
+        # A failed chunk only leaves its own words reported unknown
+        if isinstance(snaps, BaseException):
+            logger.error(f"Error checking known words concurrently: {snaps}", exc_info=snaps)
+            continue
+        for snap in snaps:
+            result[snap.id] = snap.exists
+            _cache_known(snap.id, snap.exists)
+    return result
+
+async def is_known_async(word: str) -> bool:
+    """Async `is_known`."""
+    return (await are_known_async([word]))[word]
+
+def is_known(word: str) -> bool:
+    """Checks if a word is in the known_words collection."""
+    return are_known([word])[word]
+
+def is_known_bulk(words: list) -> set:
+    """Returns the subset of `words` present in the known_words collection.
+
+    Large token lists are checked concurrently on the shared scheduler loop;
+    do not call this from that loop itself.
+    """
+    if adb is not None and len(words) > GET_ALL_CHUNK_SIZE:
+        from brain.scheduler import submit
+        known = submit(are_known_async(words)).result()
+    else:
+        known = are_known(words)
+    return {w for w, is_known_word in known.items() if is_known_word}
+
 def add_word(word: str, explanation: str, is_known: bool = False, category: str = None):
     """Adds or updates a word in the database.
 
@@ -34,20 +164,55 @@ def add_word(word: str, explanation: str, is_known: bool = False, category: str
             if category:
                 data["category"] = category
             known_ref.set(data)
+            _cache_known(word, True)
             
-            # Attempt to delete from unknown_words collection
-            unknown_ref = db.collection(UNKNOWN_WORDS_COLLECTION).document(word)
-            if unknown_ref.get().exists:
-                unknown_ref.delete()
+            # Delete from unknown_words; deleting a missing doc is a no-op, so no exists check
+            try:
+                db.collection(UNKNOWN_WORDS_COLLECTION).document(word).delete()
+            except Exception as e:
+                logger.error(f"Error removing '{word}' from unknown words: {e}", exc_info=True)
             logger.info(f"Moved word '{word}' to known words.")
         else:
             # Add to unknown_words collection
             unknown_ref = db.collection(UNKNOWN_WORDS_COLLECTION).document(word)
             unknown_ref.set({"added_at": datetime.utcnow()})
+            _invalidate_known(word)
             logger.info(f"Added word '{word}' to unknown words.")
     except Exception as e:
         logger.error(f"Error adding word '{word}': {e}", exc_info=True)
 
+def promote_words_to_known(items: list) -> int:
+    """Moves several (word, explanation, category) entries to known_words at once.
+
+    Each word is set in known_words and deleted from unknown_words inside a
+    WriteBatch, so N words cost one commit per WRITE_BATCH_MAX_OPS operations
+    instead of several round-trips each. Returns the number of words committed.
+    """
+    known_col = db.collection(KNOWN_WORDS_COLLECTION)
+    unknown_col = db.collection(UNKNOWN_WORDS_COLLECTION)
+    per_batch = WRITE_BATCH_MAX_OPS // 2  # one set + one delete per word
+    promoted = 0
+    for i in range(0, len(items), per_batch):
+        chunk = items[i:i + per_batch]
+        try:
+            batch = db.batch()
+            now = datetime.utcnow()
+            for word, explanation, category in chunk:
+                data = {"explanation": explanation, "learned_at": now}
+                if category:
+                    data["category"] = category
+                batch.set(known_col.document(word), data)
+                batch.delete(unknown_col.document(word))
+            batch.commit()
+        except Exception as e:
+            logger.error(f"Error promoting {len(chunk)} words to known: {e}", exc_info=True)
+            continue
+        for word, _, _ in chunk:
+            _cache_known(word, True)
+        promoted += len(chunk)
+    logger.info(f"Moved {promoted} words to known words.")
+    return promoted
+
 def get_unknown_words() -> list:
     """Retrieves all documents from the unknown_words collection."""
     try:
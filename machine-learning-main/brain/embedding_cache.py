@@ -0,0 +1,103 @@
+# brain/embedding_cache.py
+"""Persistent prompt-embedding cache backed by SQLite.
+
+Vectors are keyed by a 64-bit hash of the normalized prompt (see
+`prompt_key`), tagged with the embedding model that produced them, and stored
+as float16 blobs, so prompts seen in an earlier session skip the encoder after
+a restart.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+import numpy as np
+
+from config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    xxhash = None
+    XXHASH_AVAILABLE = False
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _connect():
+    """Opens (once) the cache database; returns None if it can't be opened."""
+    global _conn
+    if _conn is not None:
+        return _conn
+    try:
+        path = APP_CONFIG.EMBEDDING_CACHE_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS prompt_embeddings "
+            "(key INTEGER PRIMARY KEY, model TEXT NOT NULL, vec BLOB NOT NULL)"
+        )
+        conn.commit()
+        _conn = conn
+    except Exception as e:
+        logger.error(f"Could not open embedding cache: {e}", exc_info=True)
+    return _conn
+
+
+def normalize(prompt: str) -> str:
+    return prompt.strip().lower()
+
+
+def prompt_key(normalized: str) -> int:
+    """Signed 64-bit hash of an already-normalized prompt.
+
+    Computed once per request and shared by every prompt-keyed cache. Signed
+    so it fits SQLite's INTEGER PRIMARY KEY. Uses xxh64 when available.
+    """
+    data = normalized.encode("utf-8")
+    digest = xxhash.xxh64_digest(data) if XXHASH_AVAILABLE else hashlib.blake2b(data, digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def get(key: int) -> Optional[np.ndarray]:
+    """Returns the cached float32 vector for prompt `key`, or None."""
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT vec FROM prompt_embeddings WHERE key = ? AND model = ?",
+                (key, APP_CONFIG.CHROMA_EMBEDDING_MODEL),
+            ).fetchone()
+        except Exception as e:
+            logger.debug(f"Embedding cache read failed: {e}")
+            return None
+    if row is None:
+        return None
+    return np.frombuffer(row[0], dtype=np.float16).astype(np.float32)
+
+
+def put(key: int, vec) -> None:
+    """Stores `vec` for prompt `key` as float16."""
+    blob = np.asarray(vec, dtype=np.float16).tobytes()
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO prompt_embeddings (key, model, vec) VALUES (?, ?, ?)",
+                (key, APP_CONFIG.CHROMA_EMBEDDING_MODEL, blob),
+            )
+            conn.commit()
+        except Exception as e:
+            logger.debug(f"Embedding cache write failed: {e}")
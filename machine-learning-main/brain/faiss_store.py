@@ -0,0 +1,247 @@
+# brain/faiss_store.py
+"""Optional FAISS HNSW mirror of the knowledge collection for fast top-k retrieval.
+
+Vectors are L2-normalized and searched with squared-L2 distance, which for unit
+vectors is 2 - 2*cosine. That is the same metric Chroma's default "l2" space
+reports, so `score` values (and the 0.6 match threshold) mean the same thing
+whichever backend answers the query.
+
+HNSW indexes can't delete entries: re-upserting an id adds a new vector and
+the old slot is ignored at query time.
+
+Several processes (the API, Streamlit, Celery workers) share one index file.
+Each reloads it when the file changes on disk, re-applying its own unsaved
+rows, and saves by merging onto the latest copy under a file lock and
+atomically replacing the file, so no writer discards another's rows. The
+first load backfills anything in the Chroma collection the index lacks.
+
+With EMBEDDING_QUANT set, new indexes store 8-bit scalar-quantized codes
+(IndexHNSWSQ) instead of float32. An index already on disk keeps the type it
+was built with.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; saves there are still atomic, just unlocked
+    fcntl = None
+
+import numpy as np
+
+from config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    faiss = None
+    FAISS_AVAILABLE = False
+
+HNSW_M = 32
+SAVE_EVERY = 50  # upserts between index snapshots
+BACKFILL_PAGE_SIZE = 1000  # Chroma items fetched per get() during backfill
+
+_index = None
+_slots: List[Dict] = []       # FAISS row -> {'id', 'document', 'metadata'}
+_latest: Dict[str, int] = {}  # knowledge id -> its current FAISS row
+_pending: List[tuple] = []    # (id, unit vector, text, metadata) added since the last save
+_loaded_mtime = None          # mtime of the index file this process last read or wrote
+_backfilled = False
+_lock = threading.Lock()
+
+
+def _meta_path() -> str:
+    return APP_CONFIG.FAISS_INDEX_PATH + ".meta.json"
+
+
+def _lock_path() -> str:
+    return APP_CONFIG.FAISS_INDEX_PATH + ".lock"
+
+
+def _file_mtime():
+    try:
+        return os.stat(APP_CONFIG.FAISS_INDEX_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _append(id: str, vec: np.ndarray, text: str, metadata: Optional[Dict]):
+    """Adds one unit vector to the in-memory index. Caller holds _lock."""
+    global _index
+    if _index is None:
+        _index = new_index(vec.shape[1])
+    _index.add(vec)
+    _latest[id] = len(_slots)
+    _slots.append({"id": id, "document": text, "metadata": metadata or {}})
+
+
+def _read_from_disk():
+    """Replaces the in-memory index with the file's, then re-applies this process's unsaved rows."""
+    global _index, _slots, _latest, _loaded_mtime
+    mtime = _file_mtime()
+    if mtime is None or not os.path.exists(_meta_path()):
+        return
+    index = faiss.read_index(APP_CONFIG.FAISS_INDEX_PATH)
+    with open(_meta_path(), "r", encoding="utf-8") as f:
+        slots = json.load(f)
+    _index, _slots, _loaded_mtime = index, slots, mtime
+    _latest = {slot["id"]: row for row, slot in enumerate(_slots)}
+    for id, vec, text, metadata in _pending:
+        _append(id, vec, text, metadata)
+
+
+def _backfill_from_chroma():
+    """Adds every Chroma item the index doesn't have yet. Caller holds _lock."""
+    from services.chroma_helper import init_chroma
+    collection = init_chroma()
+    if collection is None:
+        return
+    total = collection.count()
+    if total <= len(_latest):
+        return
+    added = 0
+    for offset in range(0, total, BACKFILL_PAGE_SIZE):
+        page = collection.get(include=["embeddings", "documents", "metadatas"],
+                              limit=BACKFILL_PAGE_SIZE, offset=offset)
+        for id, embedding, text, metadata in zip(page["ids"], page["embeddings"], page["documents"], page["metadatas"]):
+            if id in _latest or embedding is None:
+                continue
+            vec = _unit(embedding)
+            _append(id, vec, text, metadata)
+            _pending.append((id, vec, text, metadata))
+            added += 1
+    if added:
+        logger.info(f"Backfilled {added} vectors from Chroma into the FAISS index.")
+
+
+def _load():
+    """Syncs with the persisted index: reads it on first use and again whenever
+    another process has saved a newer copy. Caller holds _lock."""
+    global _loaded_mtime, _backfilled
+    if not FAISS_AVAILABLE:
+        return
+    mtime = _file_mtime()
+    try:
+        if mtime != _loaded_mtime:
+            _read_from_disk()
+            if _index is not None:
+                logger.info(f"Loaded FAISS index with {_index.ntotal} vectors.")
+    except Exception as e:
+        logger.error(f"Could not load FAISS index, keeping the in-memory copy: {e}", exc_info=True)
+        _loaded_mtime = mtime  # don't retry the same unreadable file on every call
+    if not _backfilled:
+        _backfilled = True
+        try:
+            _backfill_from_chroma()
+        except Exception as e:
+            logger.error(f"Could not backfill FAISS index from Chroma: {e}", exc_info=True)
+
+
+def new_index(d: int, metric=None, hnsw: bool = True):
+    """Builds an empty index of dimension `d`, 8-bit quantized if EMBEDDING_QUANT is set.
+
+    Vectors stored in these indexes are unit-normalized, so every component lies
+    in [-1, 1]; those bounds are all the scalar quantizer needs to train on.
+    """
+    metric = faiss.METRIC_L2 if metric is None else metric
+    if APP_CONFIG.EMBEDDING_QUANT:
+        qtype = faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexHNSWSQ(d, qtype, HNSW_M, metric) if hnsw else faiss.IndexScalarQuantizer(d, qtype, metric)
+        index.train(np.vstack([-np.ones((1, d)), np.ones((1, d))]).astype(np.float32))
+        return index
+    if hnsw:
+        return faiss.IndexHNSWFlat(d, HNSW_M, metric)
+    return faiss.IndexFlat(d, metric)
+
+
+def _unit(vec) -> np.ndarray:
+    vec = np.asarray(vec, dtype=np.float32).reshape(1, -1)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _write_atomic(path: str, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def save():
+    """Merges this process's unsaved rows onto the latest index on disk and writes it back."""
+    global _loaded_mtime
+    if not FAISS_AVAILABLE:
+        return
+    with _lock:
+        if not _pending:
+            return
+        try:
+            os.makedirs(os.path.dirname(APP_CONFIG.FAISS_INDEX_PATH) or ".", exist_ok=True)
+            with open(_lock_path(), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Pick up rows other processes saved since our last read
+                if _file_mtime() != _loaded_mtime:
+                    _read_from_disk()
+                # The sidecar goes first: a reader seeing the new index file also sees its rows
+                _write_atomic(_meta_path(), lambda tmp: _dump_json(tmp, _slots))
+                _write_atomic(APP_CONFIG.FAISS_INDEX_PATH, lambda tmp: faiss.write_index(_index, tmp))
+                _loaded_mtime = _file_mtime()
+            _pending.clear()
+        except Exception as e:
+            logger.error(f"Could not save FAISS index: {e}", exc_info=True)
+
+
+def _dump_json(path: str, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+atexit.register(save)
+
+
+def add(id: str, embedding, text: str, metadata: Optional[Dict] = None) -> bool:
+    """Adds (or replaces) a knowledge item's vector."""
+    if not FAISS_AVAILABLE or embedding is None:
+        return False
+    vec = _unit(embedding)
+    with _lock:
+        _load()
+        _append(id, vec, text, metadata)
+        _pending.append((id, vec, text, metadata))
+        should_save = len(_pending) >= SAVE_EVERY
+    if should_save:
+        save()
+    return True
+
+
+def query(embedding, n_results: int = 5) -> List[Dict]:
+    """Returns the nearest items in query_similar's format; [] if unavailable."""
+    if not FAISS_AVAILABLE or embedding is None:
+        return []
+    vec = _unit(embedding)
+    with _lock:
+        _load()
+        if _index is None or _index.ntotal == 0:
+            return []
+        # Over-fetch a little so superseded rows can be skipped
+        D, I = _index.search(vec, min(_index.ntotal, n_results * 4))
+        docs = []
+        for dist, row in zip(D[0], I[0]):
+            if row < 0 or _latest.get(_slots[row]["id"]) != row:
+                continue
+            slot = _slots[row]
+            docs.append({"id": slot["id"], "document": slot["document"], "metadata": slot["metadata"], "score": float(dist)})
+            if len(docs) >= n_results:
+                break
+        # A first-load backfill leaves rows to persist
+        should_save = len(_pending) >= SAVE_EVERY
+    if should_save:
+        save()
+    return docs
@@ -1,18 +1,177 @@
 
+import asyncio
 import logging
-import json
-from typing import List, Dict
-from datetime import datetime
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Iterator, Optional
+
+import numpy as np
+import orjson
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    faiss = None
+    FAISS_AVAILABLE = False
+
+from google.cloud.firestore import SERVER_TIMESTAMP
+from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions
 
 from services.services import db, nlp, get_health_status
-from services.chroma_helper import upsert_knowledge, query_similar, init_chroma
-from services.ai_providers import groq_generate_text
+from services.chroma_helper import upsert_knowledge, query_similar, init_chroma, embed_text, add_upsert_listener
+from services.ai_providers import groq_generate_text, GROQ_UNAVAILABLE_RESPONSE, GROQ_FAILED_RESPONSE
+from brain import embedding_cache, faiss_store
+from brain.db import UNKNOWN_WORDS_COLLECTION, _invalidate_known
+from config import APP_CONFIG
 
 logger = logging.getLogger(__name__)
 
-def generate_response_from_knowledge(prompt_text: str, conversation_context: List = None) -> Dict:
+EMBED_CACHE_SIZE = 2048
+# needs_review/unknown_words writes are committed off the caller's thread.
+_write_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kb-writes")
+
+
+@lru_cache(maxsize=EMBED_CACHE_SIZE)
+def _embed_prompt(prompt_key: int, normalized: str) -> Optional[np.ndarray]:
+    """Embeds a normalized prompt once; repeats are served from the LRU, then the on-disk cache."""
+    vec = embedding_cache.get(prompt_key)
+    if vec is None:
+        vec = embed_text(normalized)
+        if vec is None:
+            return None
+        vec = np.asarray(vec, dtype=np.float32)
+        embedding_cache.put(prompt_key, vec)
+    # Shared between callers through the cache, so make it read-only
+    vec.flags.writeable = False
+    return vec
+
+
+def embedding_cache_stats() -> Dict:
+    """Hit/miss counters for the prompt embedding cache."""
+    info = _embed_prompt.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+
+def _prompt_embedding(prompt_key: int, normalized: str) -> Optional[np.ndarray]:
+    try:
+        return _embed_prompt(prompt_key, normalized)
+    except Exception as e:
+        logger.debug("Prompt embedding failed, letting Chroma embed the query: %s", e)
+        return None
+
+
+# Semantic response cache: recent query vectors (inner-product index over
+# L2-normalized vectors, i.e. cosine) -> the knowledge-base answer they got.
+# Near-duplicate prompts are answered without a Chroma query, and exact
+# repeats (same prompt key) without embedding at all. Entries expire after
+# RESPONSE_CACHE_TTL (which bounds staleness from other processes' upserts)
+# and are evicted by concept id when this process upserts that concept.
+RESPONSE_CACHE_MIN_SIMILARITY = 0.98
+RESPONSE_CACHE_MAX = 10_000
+RESPONSE_CACHE_TTL = 600.0
+_resp_cache_exact: "OrderedDict[int, Dict]" = OrderedDict()
+_resp_cache_index = None
+_resp_cache_vecs: List[np.ndarray] = []
+_resp_cache_meta: List[Dict] = []
+_resp_cache_lock = threading.Lock()
+
+
+def _normalized(vec: np.ndarray) -> np.ndarray:
+    vec = np.asarray(vec, dtype=np.float32).reshape(1, -1)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _live(meta: Dict) -> bool:
+    return meta['expires_at'] > time.monotonic()
+
+
+def _response_cache_get_exact(prompt_key: int) -> Optional[Dict]:
+    with _resp_cache_lock:
+        meta = _resp_cache_exact.get(prompt_key)
+        if meta is None:
+            return None
+        if not _live(meta):
+            del _resp_cache_exact[prompt_key]
+            return None
+        _resp_cache_exact.move_to_end(prompt_key)
+        return meta
+
+
+def _response_cache_lookup(query: Optional[np.ndarray]) -> Optional[Dict]:
+    """`query` is the prompt's normalized (1, d) vector."""
+    if not FAISS_AVAILABLE or query is None:
+        return None
+    with _resp_cache_lock:
+        if _resp_cache_index is None or _resp_cache_index.ntotal == 0 or _resp_cache_index.d != query.shape[1]:
+            return None
+        D, I = _resp_cache_index.search(query, 1)
+        if D[0, 0] >= RESPONSE_CACHE_MIN_SIMILARITY:
+            meta = _resp_cache_meta[I[0, 0]]
+            if _live(meta):
+                return meta
+    return None
+
+
+def _response_cache_add(prompt_key: int, vec: Optional[np.ndarray], meta: Dict):
+    """`vec` is the prompt's normalized (1, d) vector; `meta` holds 'answer', 'raw_knowledge' and 'concept_id'."""
+    global _resp_cache_index, _resp_cache_vecs, _resp_cache_meta
+    meta['expires_at'] = time.monotonic() + RESPONSE_CACHE_TTL
+    with _resp_cache_lock:
+        _resp_cache_exact[prompt_key] = meta
+        if len(_resp_cache_exact) > RESPONSE_CACHE_MAX:
+            _resp_cache_exact.popitem(last=False)
+    if not FAISS_AVAILABLE or vec is None:
+        return
+    with _resp_cache_lock:
+        if _resp_cache_index is None or _resp_cache_index.d != vec.shape[1]:
+            _resp_cache_index = faiss_store.new_index(vec.shape[1], faiss.METRIC_INNER_PRODUCT, hnsw=False)
+            _resp_cache_vecs, _resp_cache_meta = [], []
+        if _resp_cache_index.ntotal >= RESPONSE_CACHE_MAX:
+            # Flat indexes can't drop single entries; rebuild with the newest half
+            keep = RESPONSE_CACHE_MAX // 2
+            _resp_cache_vecs, _resp_cache_meta = _resp_cache_vecs[-keep:], _resp_cache_meta[-keep:]
+            _resp_cache_index = faiss_store.new_index(vec.shape[1], faiss.METRIC_INNER_PRODUCT, hnsw=False)
+            _resp_cache_index.add(np.vstack(_resp_cache_vecs))
+        _resp_cache_index.add(vec)
+        _resp_cache_vecs.append(vec)
+        _resp_cache_meta.append(meta)
+
+
+def invalidate_response_cache(concept_id: Optional[str] = None):
+    """Drops cached answers built from `concept_id`, or every cached answer if it is None."""
+    with _resp_cache_lock:
+        for key in [k for k, meta in _resp_cache_exact.items() if concept_id is None or meta['concept_id'] == concept_id]:
+            del _resp_cache_exact[key]
+        # Semantic entries can't be removed from the flat index; expire them instead
+        for meta in _resp_cache_meta:
+            if concept_id is None or meta['concept_id'] == concept_id:
+                meta['expires_at'] = 0.0
+
+
+# Upserting a concept changes the answer for prompts that matched it
+add_upsert_listener(invalidate_response_cache)
+
+def generate_response_from_knowledge(prompt_text: str, conversation_context: List = None) -> Iterator[str]:
+    """
+    Generates a response by querying the knowledge base, yielded as text deltas.
+
+    Knowledge-base answers are stored documents, so today the whole answer is
+    one delta; a streaming provider can yield token deltas here without
+    changing callers.
+    """
+    answer = _knowledge_response(prompt_text, conversation_context=conversation_context).get("synthesized_answer")
+    if answer:
+        yield answer
+
+def _knowledge_response(prompt_text: str, conversation_context: List = None) -> Dict:
     """
-    Generates a response by querying the knowledge base.
+    Looks the prompt up in the knowledge base.
     If a strong match is found, it returns the stored knowledge directly.
     Otherwise, it indicates that it needs to learn.
     """
@@ -26,8 +185,27 @@ def generate_response_from_knowledge(prompt_text: str, conversation_context: Lis
     if not health['all_services_ok']:
         return response_data
 
-    # Query for the single most similar concept
-    similar_concepts = query_similar(prompt_text, n_results=1)
+    # Normalize and hash the prompt once; every prompt-keyed cache shares the key
+    normalized = embedding_cache.normalize(prompt_text)
+    prompt_key = embedding_cache.prompt_key(normalized)
+    cached = _response_cache_get_exact(prompt_key)
+    embedding = unit = None
+    if cached is None:
+        # Embed the prompt once; the response cache and Chroma both reuse it
+        embedding = _prompt_embedding(prompt_key, normalized)
+        unit = _normalized(embedding) if embedding is not None else None
+        cached = _response_cache_lookup(unit)
+    if cached is not None:
+        response_data['synthesized_answer'] = cached['answer']
+        response_data['raw_knowledge'] = list(cached['raw_knowledge'])
+        return response_data
+
+    # Query for the single most similar concept. FAISS scores use the same
+    # squared-L2 scale as Chroma's, so the threshold below applies to both.
+    if APP_CONFIG.USE_FAISS_RETRIEVAL and faiss_store.FAISS_AVAILABLE and embedding is not None:
+        similar_concepts = faiss_store.query(embedding, n_results=1)
+    else:
+        similar_concepts = query_similar(prompt_text, n_results=1, query_embeddings=embedding)
 
     if similar_concepts:
         top_concept = similar_concepts[0]
@@ -41,6 +219,9 @@ def generate_response_from_knowledge(prompt_text: str, conversation_context: Lis
             answer = top_concept.get('document')
             response_data['synthesized_answer'] = answer
             response_data['raw_knowledge'] = [top_concept]
+            # Only knowledge-base answers are cached; misses must still log unknowns
+            _response_cache_add(prompt_key, unit, {'answer': answer, 'raw_knowledge': [top_concept],
+                                                   'concept_id': top_concept.get('id')})
         else:
             # Match is not strong enough
             response_data['synthesized_answer'] = "I don't have enough information to answer that question. I will try to learn about it."
@@ -54,7 +235,7 @@ def generate_response_from_knowledge(prompt_text: str, conversation_context: Lis
 
 def refine_knowledge_entry(topic: str, knowledge_data: Dict) -> Dict:
     """Refines a knowledge entry using an LLM."""
-    logger.info(f"Refining knowledge for: {topic}")
+    logger.info("Refining knowledge for: %s", topic)
 
     system_prompt = "You are a knowledge architect. Your task is to refine and improve the provided knowledge entry. Do not change the topic."
     user_prompt = f"Topic: {topic}\n\nKnowledge: {knowledge_data}"
@@ -65,19 +246,153 @@ def refine_knowledge_entry(topic: str, knowledge_data: Dict) -> Dict:
 
 def extract_related_topics(text: str) -> List[str]:
     """Extracts related topics from a given text using an LLM."""
-    logger.info(f"Extracting related topics from text.")
+    logger.info("Extracting related topics from text.")
     
     system_prompt = "You are an expert in knowledge graph generation. Your task is to extract related topics from the given text. Return the topics as a JSON object with a single key 'topics' which is a list of strings."
     user_prompt = f"Text: {text}"
     
     response = groq_generate_text(system_prompt, user_prompt)
-    
+    if response in (GROQ_UNAVAILABLE_RESPONSE, GROQ_FAILED_RESPONSE):
+        # Nothing to parse; groq_generate_text has already logged why
+        return []
+
     try:
-        data = json.loads(response)
-        return data.get("topics", [])
-    except json.JSONDecodeError:
-        logger.error(f"Failed to decode JSON from LLM response: {response}")
+        data = orjson.loads(response)
+    except orjson.JSONDecodeError:
+        logger.error("Failed to decode JSON from LLM response: %s", response)
         return []
+    if not isinstance(data, dict) or not isinstance(data.get("topics"), list):
+        logger.error("LLM response is missing a 'topics' list: %s", response)
+        return []
+    return data["topics"]
+
+# Async variants so independent LLM round-trips can overlap. The provider
+# clients are synchronous (and wrapped in retry/coalescing), so each call runs
+# in a worker thread; the GIL is released while waiting on the network.
+async def refine_knowledge_entry_async(topic: str, knowledge_data: Dict) -> Dict:
+    return await asyncio.to_thread(refine_knowledge_entry, topic, knowledge_data)
+
+async def extract_related_topics_async(text: str) -> List[str]:
+    return await asyncio.to_thread(extract_related_topics, text)
+
+async def refine_many(items: List[tuple]) -> List[Dict]:
+    """Refines several (topic, knowledge_data) entries concurrently, in input order."""
+    return await asyncio.gather(*(refine_knowledge_entry_async(t, k) for t, k in items))
+
+async def extract_related_topics_batch(texts: List[str]) -> List[List[str]]:
+    """Extracts related topics for several texts concurrently, in input order."""
+    return await asyncio.gather(*(extract_related_topics_async(t) for t in texts))
+
+# Words never worth logging as unknown concepts: function words plus very common verbs.
+_STOPSET = frozenset({
+    "what", "the", "is", "a", "an", "i", "you", "it", "this", "that", "does", "do", "how", "why",
+    "be", "have", "make", "take", "get", "go", "know", "think", "see", "come", "use", "find",
+    "give", "tell", "work", "call", "ask", "need", "feel", "become", "leave", "put", "mean",
+    "keep", "let", "begin", "seem", "help", "talk", "turn", "start", "show", "hear", "act", "move",
+    "like", "live", "believe", "hold", "bring", "happen", "write", "provide", "sit", "stand",
+    "lose", "pay", "meet", "include", "continue", "set", "learn", "change", "lead", "understand",
+    "watch", "follow", "stop", "create", "speak", "read", "allow", "add", "spend", "grow", "open",
+    "walk", "win", "offer", "remember", "love", "consider", "appear", "buy", "wait", "serve",
+    "die", "send", "expect", "build", "stay", "fall", "cut", "reach", "kill", "remain", "suggest",
+    "raise", "pass", "sell", "require", "report", "decide", "pull", "explain", "develop", "carry",
+    "break", "receive", "agree", "support", "hit", "produce", "eat", "cover", "catch", "draw",
+    "choose", "strike", "manage", "shake", "drink", "share", "spread", "prepare", "try", "release",
+    "search", "charge", "race", "climb", "rush", "mix", "mark", "fight", "fit", "establish",
+    "cook", "jump", "laugh", "apply", "score", "operate", "divide", "sign", "hang", "rest", "sing",
+    "arrive", "return", "visit", "teach", "earn", "travel", "fly", "damage", "solve", "wrestle",
+    "swim", "hunt", "achieve", "throw", "destroy", "dance", "suffer", "trade", "slip", "protect",
+    "represent", "join", "drive", "repair", "master", "behave", "command", "ring", "pray",
+    "notice", "reflect", "blame", "regret", "admit", "extend", "waste", "supply", "retire",
+    "employ", "escape", "grant", "resolve", "prove", "install", "engage", "generate", "inherit",
+    "adopt", "succeed", "submit", "embrace"
+})
+_MIN_LEN = 3
+# Fallback tokenizer when spaCy is unavailable: runs of 4+ ASCII letters.
+_WORD_RE = re.compile(r"[A-Za-z]{4,}")
+
+NLP_PIPE_BATCH_SIZE = 32
+
+# Unknown-word logging goes through Firestore's BulkWriter, which batches,
+# rate-limits and retries writes itself.
+BULK_WRITER_OPS_PER_SECOND = 500
+BULK_WRITE_MAX_ATTEMPTS = 3
+
+
+def _retry_bulk_write(error, bulk_writer) -> bool:
+    """BulkWriter error callback: retry each failed write up to BULK_WRITE_MAX_ATTEMPTS times.
+
+    `error` is a BulkWriteFailure; the failed document is `error.operation.reference`.
+    """
+    if error.attempts < BULK_WRITE_MAX_ATTEMPTS:
+        return True
+    logger.error("Giving up on write to %s after %d attempts: %s", error.operation.reference.path, error.attempts, error.message)
+    return False
+
+
+def _commit_review_batches(entries: List[tuple]):
+    """Writes review entries and their candidates through one BulkWriter.
+
+    `entries` is a list of (prompt, candidates) pairs; each gets its own
+    needs_review doc, and every candidate an unknown_words doc.
+    """
+    try:
+        # Stamped by Firestore at commit time; no client clock read per write
+        now = SERVER_TIMESTAMP
+        review_col = db.collection('needs_review')
+        unknown_col = db.collection(UNKNOWN_WORDS_COLLECTION)
+        bw = db.bulk_writer(options=BulkWriterOptions(initial_ops_per_second=BULK_WRITER_OPS_PER_SECOND))
+        bw.on_write_error(_retry_bulk_write)
+
+        all_candidates = set()
+        for prompt, candidates in entries:
+            bw.create(review_col.document(), {
+                'prompt': prompt,
+                'candidates': candidates,
+                'reason': 'Extracted candidate unknown concepts (deduplicated)',
+                'timestamp': now
+            })
+            all_candidates.update(candidates)
+        for cand in all_candidates:
+            bw.set(unknown_col.document(cand), {"added_at": now}, merge=True)
+        bw.close()
+        for cand in all_candidates:
+            _invalidate_known(cand)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Logged %d prompt(s) for review with deduplicated candidates: %s", len(entries), sorted(all_candidates))
+    except Exception as e:
+        logger.error("Error logging prompts for review: %s", e, exc_info=True)
+
+def _extract_candidates(prompt: str, doc=None) -> List[str]:
+    """Returns the sorted, deduplicated candidate unknown concepts for one prompt.
+
+    `doc` is the prompt's spaCy Doc; without one a simple word heuristic is used.
+    """
+    candidates = set()
+
+    if doc is not None:
+        # Extract meaningful noun chunks (multi-word candidate phrases)
+        for chunk in doc.noun_chunks:
+            # Build lemmatized phrase from non-stop alphabetic tokens
+            lemmas = [tok.lemma_.lower() for tok in chunk if not tok.is_stop and tok.is_alpha]
+            if not lemmas:
+                continue
+            phrase = " ".join(lemmas).strip()
+            if len(phrase) >= _MIN_LEN and phrase not in _STOPSET:
+                candidates.add(phrase)
+
+        # Also extract single-token nouns/proper nouns
+        for tok in doc:
+            if tok.pos_ in ("NOUN", "PROPN") and not tok.is_stop and tok.is_alpha:
+                lemma = tok.lemma_.lower()
+                if len(lemma) >= _MIN_LEN and lemma not in _STOPSET:
+                    candidates.add(lemma)
+    else:
+        # Fallback: very simple heuristic split
+        candidates.update(w for w in _WORD_RE.findall(prompt.lower()) if w not in _STOPSET)
+
+    # Deduplication: remove single tokens if they appear in multi-word phrases
+    contained = {tok for phrase in candidates if " " in phrase for tok in phrase.split()}
+    return sorted(candidates - contained)
 
 def detect_and_log_unknown_words(prompt: str):
     """
@@ -86,68 +401,26 @@ def detect_and_log_unknown_words(prompt: str):
     overlapping phrases, logs the cleaned candidates to Firestore (`needs_review`) and 
     adds them to the `unknown_words` collection for the learning pipeline.
     """
-    try:
-        candidates = set()
-        stopset = {"what", "the", "is", "a", "an", "i", "you", "it", "this", "that", "does", "do", "how", "why", "be", "have", "make", "take", "get", "go", "know", "think", "see", "come", "come", "use", "find", "give", "tell", "work", "call", "ask", "need", "feel", "become", "leave", "put", "mean", "keep", "let", "begin", "seem", "help", "talk", "turn", "start", "show", "hear", "act", "show", "move", "like", "live", "believe", "hold", "bring", "happen", "write", "provide", "sit", "stand", "lose", "pay", "meet", "include", "continue", "set", "learn", "change", "lead", "understand", "watch", "follow", "stop", "create", "speak", "read", "allow", "add", "spend", "grow", "open", "walk", "win", "offer", "remember", "love", "consider", "appear", "buy", "wait", "serve", "die", "send", "expect", "build", "stay", "fall", "cut", "reach", "kill", "remain", "suggest", "raise", "pass", "sell", "require", "report", "decide", "pull", "explain", "develop", "carry", "break", "receive", "agree", "support", "hit", "produce", "eat", "cover", "catch", "draw", "choose", "strike", "manage", "shake", "drink", "choose", "share", "spread", "prepare", "speak", "try", "release", "search", "charge", "race", "climb", "rush", "mix", "mark", "fight", "fit", "establish", "cook", "jump", "laugh", "apply", "spend", "score", "operate", "divide", "sign", "hang", "rest", "serve", "sing", "arrive", "return", "visit", "teach", "earn", "travel", "fly", "damage", "solve", "wrestle", "swim", "teach", "hunt", "achieve", "establish", "throw", "destroy", "dance", "suffer", "start", "spend", "trade", "slip", "protect", "represent", "join", "drive", "repair", "master", "suffer", "behave", "command", "ring", "pray", "notice", "reflect", "blame", "regret", "admit", "suffer", "extend", "waste", "supply", "retire", "employ", "escape", "grant", "resolve", "prove", "install", "engage", "generate", "inherit", "adopt", "succeed", "admit", "submit", "embrace", "suffer"}
+    detect_and_log_unknown_words_batch([prompt])
 
+def detect_and_log_unknown_words_batch(prompts: List[str]):
+    """
+    Batch form of `detect_and_log_unknown_words`: parses all prompts with one
+    `nlp.pipe` pass and logs every prompt's candidates in shared write batches.
+    """
+    try:
         if nlp:
-            doc = nlp(prompt)
-
-            # Extract meaningful noun chunks (multi-word candidate phrases)
-            for chunk in doc.noun_chunks:
-                # Build lemmatized phrase from non-stop alphabetic tokens
-                lemmas = [tok.lemma_.lower() for tok in chunk if not tok.is_stop and tok.is_alpha]
-                if not lemmas:
-                    continue
-                phrase = " ".join(lemmas).strip()
-                if len(phrase) >= 3 and phrase not in stopset:
-                    candidates.add(phrase)
-
-            # Also extract single-token nouns/proper nouns
-            for tok in doc:
-                if tok.pos_ in ("NOUN", "PROPN") and not tok.is_stop and tok.is_alpha:
-                    lemma = tok.lemma_.lower()
-                    if len(lemma) >= 3 and lemma not in stopset:
-                        candidates.add(lemma)
+            docs = nlp.pipe(prompts, batch_size=NLP_PIPE_BATCH_SIZE)
         else:
-            # Fallback: very simple heuristic split
-            for part in prompt.split():
-                word = ''.join(ch for ch in part.lower() if ch.isalpha())
-                if len(word) >= 4 and word not in stopset:
-                    candidates.add(word)
-
-        # Deduplication: remove single tokens if they appear in multi-word phrases
-        dedup_candidates = set(candidates)
-        for phrase in list(dedup_candidates):
-            if " " in phrase:  # Multi-word phrase
-                for token in phrase.split():
-                    dedup_candidates.discard(token)
-
-        # Save review entry with cleaned candidates and original prompt
+            docs = [None] * len(prompts)
+        entries = [(prompt, _extract_candidates(prompt, doc)) for prompt, doc in zip(prompts, docs)]
+
+        # Save review entries with cleaned candidates and original prompts
+        # and add each candidate to unknown_words for the learning pipeline, batched and off-thread
         if db:
-            try:
-                review_ref = db.collection('needs_review').document()
-                review_ref.set({
-                    'prompt': prompt,
-                    'candidates': sorted(list(dedup_candidates)),
-                    'reason': 'Extracted candidate unknown concepts (deduplicated)',
-                    'timestamp': datetime.utcnow()
-                })
-                logger.info(f"Logged prompt for review with deduplicated candidates: {dedup_candidates}")
-
-                # Add each candidate to unknown_words collection for learning pipeline
-                from brain.db import add_word
-                for cand in dedup_candidates:
-                    try:
-                        # add_word with is_known=False will create an entry in unknown_words
-                        add_word(cand, explanation="", is_known=False)
-                    except Exception as e:
-                        logger.debug(f"Failed to add unknown candidate {cand}: {e}")
-
-            except Exception as e:
-                logger.error(f"Error logging prompt for review: {e}", exc_info=True)
+            _write_pool.submit(_commit_review_batches, entries)
         else:
             logger.warning("No Firestore DB available to log unknowns.")
 
     except Exception as e:
-        logger.error(f"Error in detect_and_log_unknown_words: {e}", exc_info=True)
+        logger.error("Error in detect_and_log_unknown_words: %s", e, exc_info=True)
@@ -0,0 +1,46 @@
+# brain/scheduler.py
+"""Single background event loop for long-lived periodic/background coroutines.
+
+Background work here is mostly waiting (timers, network I/O), so all of it
+shares one asyncio loop on one daemon thread instead of one thread per task.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_loop = asyncio.new_event_loop()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _ensure_running():
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop.run_forever, name="brain-scheduler", daemon=True)
+            _thread.start()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the scheduler loop, starting its thread on first use."""
+    _ensure_running()
+    return _loop
+
+
+def submit(coro) -> Future:
+    """Schedules a coroutine on the background loop and returns its concurrent Future."""
+    _ensure_running()
+    future = asyncio.run_coroutine_threadsafe(coro, _loop)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def _log_failure(future: Future):
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc:
+        logger.error(f"Background task failed: {exc}", exc_info=exc)
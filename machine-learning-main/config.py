@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # --- Load Environment Variables ---
@@ -17,35 +18,47 @@ LOG_LEVELS = {
     "CRITICAL": 50,
 }
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, kw_only=True)
 class Config:
     """
     A centralized, immutable configuration class for the application.
 
-    This dataclass fetches its values from environment variables, providing a single,
+    Its values come from environment variables, read once by `get_config()`, providing a single,
     reliable source of truth for all configuration settings. Using a dataclass
     ensures that the configuration is type-safe and cannot be changed at runtime,
     preventing a wide class of potential bugs.
 
-    The `frozen=True` argument makes instances of this class immutable.
+    The `frozen=True` argument makes instances of this class immutable, and
+    `slots=True` drops the per-instance `__dict__`. Fields are keyword-only so
+    `get_config()` can pass the environment-derived values by name.
     """
     
     # --- General App Settings ---
-    LOG_LEVEL: int = LOG_LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").upper(), 20)
+    LOG_LEVEL: int
 
     # --- External Service API Keys ---
     # Fetches API keys from environment variables. Returns None if a key is not set.
-    GEMINI_API_KEY: str | None = os.environ.get("GEMINI_API_KEY")
-    GROQ_API_KEY: str | None = os.environ.get("GROQ_API_KEY")
+    GEMINI_API_KEY: str | None
+    GROQ_API_KEY: str | None
 
     # --- AI Model Specifications ---
     # Defines the specific models to be used with the AI services.
-    GEMINI_MODEL: str = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash-latest")
-    GROQ_MODEL: str = os.environ.get("GROQ_MODEL", "llama3-8b-8192")
+    GEMINI_MODEL: str
+    GROQ_MODEL: str
+
+    # --- AI Provider Resilience ---
+    # Number of retries (with exponential backoff) on rate limits and transient 5xx errors.
+    PROVIDER_MAX_RETRIES: int
+    # Per-request timeout (seconds) for Groq/Gemini calls, so a hung provider cannot stall a job.
+    PROVIDER_TIMEOUT: float
+    # Upper bound on Gemini output tokens for a single generate_content call.
+    GEMINI_MAX_OUTPUT_TOKENS: int
+    # When enabled, generate_text races providers concurrently instead of trying them in turn.
+    PROVIDER_HEDGED_REQUESTS: bool
     
     # --- Firebase Configuration ---
     # Retrieves the full Firebase credentials JSON from an environment variable.
-    FIREBASE_CREDENTIALS_JSON: str | None = os.environ.get("FIREBASE_CREDENTIALS")
+    FIREBASE_CREDENTIALS_JSON: str | None
 
     # --- NLP Model ---
     # Specifies the spaCy model for Natural Language Processing tasks.
@@ -53,19 +66,58 @@ class Config:
 
     # --- Vector Database ---
     # Specifies the directory to persist ChromaDB data.
-    CHROMA_PERSIST_DIRECTORY: str = os.environ.get("CHROMA_PERSIST_DIRECTORY", "db/chroma")
+    CHROMA_PERSIST_DIRECTORY: str
     
     # --- Remote settings for deployment (e.g., Streamlit Cloud) ---
-    CHROMA_HOST: str | None = os.environ.get("CHROMA_HOST")
-    CHROMA_PORT: int | None = int(os.environ.get("CHROMA_PORT")) if os.environ.get("CHROMA_PORT") else None
+    CHROMA_HOST: str | None
+    CHROMA_PORT: int | None
 
-    CHROMA_EMBEDDING_MODEL: str = os.environ.get("CHROMA_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-    CHROMA_COLLECTION_NAME: str = os.environ.get("CHROMA_COLLECTION_NAME", "knowledge_base")
+    CHROMA_EMBEDDING_MODEL: str
+    CHROMA_COLLECTION_NAME: str
+    # SQLite file for cached prompt embeddings (survives restarts).
+    EMBEDDING_CACHE_PATH: str
+    # SQLite file for cached web-research results, and how long (seconds) they stay fresh.
+    RESEARCH_CACHE_PATH: str
+    RESEARCH_CACHE_TTL: int
+    # Mirror knowledge vectors into a local FAISS HNSW index and answer retrieval from it instead of Chroma.
+    USE_FAISS_RETRIEVAL: bool
+    FAISS_INDEX_PATH: str
+    # Store FAISS vectors as 8-bit scalar-quantized codes (4x smaller) instead of float32.
+    EMBEDDING_QUANT: bool
     # --- Ignis (local/custom model) endpoint ---
-    IGNIS_API_URL: str | None = os.environ.get("IGNIS_API_URL")
-    IGNIS_MODEL_NAME: str = os.environ.get("IGNIS_MODEL_NAME", "Ignis")
+    IGNIS_API_URL: str | None
+    IGNIS_MODEL_NAME: str
 
 # --- Global Configuration Instance ---
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Reads the environment once and returns the process-wide Config, reused on later calls."""
+    return Config(
+        LOG_LEVEL=LOG_LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").upper(), 20),
+        GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY"),
+        GROQ_API_KEY=os.environ.get("GROQ_API_KEY"),
+        GEMINI_MODEL=os.environ.get("GEMINI_MODEL", "gemini-1.5-flash-latest"),
+        GROQ_MODEL=os.environ.get("GROQ_MODEL", "llama3-8b-8192"),
+        PROVIDER_MAX_RETRIES=int(os.environ.get("PROVIDER_MAX_RETRIES", "3")),
+        PROVIDER_TIMEOUT=float(os.environ.get("PROVIDER_TIMEOUT", "60")),
+        GEMINI_MAX_OUTPUT_TOKENS=int(os.environ.get("GEMINI_MAX_OUTPUT_TOKENS", "1024")),
+        PROVIDER_HEDGED_REQUESTS=os.environ.get("PROVIDER_HEDGED_REQUESTS", "false").lower() in ("1", "true", "yes"),
+        FIREBASE_CREDENTIALS_JSON=os.environ.get("FIREBASE_CREDENTIALS"),
+        CHROMA_PERSIST_DIRECTORY=os.environ.get("CHROMA_PERSIST_DIRECTORY", "db/chroma"),
+        CHROMA_HOST=os.environ.get("CHROMA_HOST"),
+        CHROMA_PORT=int(os.environ.get("CHROMA_PORT")) if os.environ.get("CHROMA_PORT") else None,
+        CHROMA_EMBEDDING_MODEL=os.environ.get("CHROMA_EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+        CHROMA_COLLECTION_NAME=os.environ.get("CHROMA_COLLECTION_NAME", "knowledge_base"),
+        EMBEDDING_CACHE_PATH=os.environ.get("EMBEDDING_CACHE_PATH", "db/embedding_cache.sqlite3"),
+        RESEARCH_CACHE_PATH=os.environ.get("RESEARCH_CACHE_PATH", "db/research_cache.sqlite3"),
+        RESEARCH_CACHE_TTL=int(os.environ.get("RESEARCH_CACHE_TTL", "86400")),
+        USE_FAISS_RETRIEVAL=os.environ.get("USE_FAISS_RETRIEVAL", "false").lower() in ("1", "true", "yes"),
+        FAISS_INDEX_PATH=os.environ.get("FAISS_INDEX_PATH", "db/faiss/knowledge.index"),
+        EMBEDDING_QUANT=os.environ.get("EMBEDDING_QUANT", "false").lower() in ("1", "true", "yes"),
+        IGNIS_API_URL=os.environ.get("IGNIS_API_URL"),
+        IGNIS_MODEL_NAME=os.environ.get("IGNIS_MODEL_NAME", "Ignis"),
+    )
+
 # A single, immutable instance of the Config class that is imported by other modules.
 # This singleton pattern ensures that configuration is consistent across the application.
-APP_CONFIG = Config()
+APP_CONFIG = get_config()
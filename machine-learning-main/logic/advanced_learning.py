@@ -1,117 +1,336 @@
 """Advanced learning module with scheduled background learning and deep learning capabilities."""
 
+import asyncio
 import logging
+import threading
 import time
+import orjson
 from datetime import datetime, timedelta
 from typing import Dict, List
-from services.services import db
-from services.ai_providers import groq_generate_text
-from services.researcher import quick_research, research_new_concept
-from utils.categorizer import categorize_text
-from utils.relationship_mapper import find_and_map_relationships
-from brain.db import get_unknown_words, add_word, is_known
-import google.generativeai as genai
-from config import APP_CONFIG
+from google.cloud.firestore_v1 import FieldPath
+from services.services import db, get_gemini_model
+from services.ai_providers import groq_generate_text, GROQ_UNAVAILABLE_RESPONSE, GROQ_FAILED_RESPONSE
+from services.researcher import quick_research, research_new_concept_async
+from utils.categorizer import categorize_text_async
+from utils.relationship_mapper import find_and_map_relationships_bulk
+from brain.db import get_unknown_words, promote_words_to_known
+from brain.scheduler import submit
 
 logger = logging.getLogger(__name__)
 
-# Global state
-_last_learning_run = None
-LEARNING_INTERVAL = 60  # 1 minute in seconds
+LEARNING_INTERVAL = 60  # seconds between scheduled quick-learning cycles
+# Per-word learning is network-bound, so words are learned concurrently,
+# capped to stay inside provider rate limits (Groq allows ~30 requests/min).
+LEARN_CONCURRENCY = 8
+CATEGORIES = ("Factual", "Conceptual", "Procedural", "Adversarial")
+# Documents in solidified_knowledge that aren't concepts and are never deepened.
+NON_CONCEPT_DOC_IDS = ('solidified_knowledge', '_default_', 'sentence_patterns')
+# Category used when classification is unavailable or leaves a word out.
+DEFAULT_CATEGORY = "Conceptual"
 
 
-def should_run_learning() -> bool:
-    """Check if enough time has passed since last learning run."""
-    global _last_learning_run
-    
-    if _last_learning_run is None:
-        return True
-    
-    elapsed = time.time() - _last_learning_run
-    return elapsed >= LEARNING_INTERVAL
+# Scheduled-learning state. The scheduler coroutine is the only writer of
+# _schedule; _cycle_lock keeps a manual run from overlapping a scheduled one.
+_schedule = {"next_run": None, "last_result": None}
+_cycle_lock = asyncio.Lock()
+_scheduler_future = None
+_scheduler_start_lock = threading.Lock()
 
 
-def quick_learn_unknowns() -> Dict:
-    """Quick learning of unknown concepts using Groq (fast, every 1 minute)."""
-    global _last_learning_run
-    
-    if not should_run_learning():
-        return {"status": "skipped", "reason": "Not enough time has passed"}
-    
-    logger.info("🚀 Starting quick learning cycle...")
-    _last_learning_run = time.time()
-    
-    results = {
-        "status": "started",
-        "learned_count": 0,
-        "errors": [],
-        "timestamp": datetime.now().isoformat()
-    }
-    
+def _record_error(results: Dict, word: str, e: Exception, what: str):
+    err_type = e.__class__.__name__
+    results["errors"].append({
+        "word": word,
+        "type": err_type,
+        "message": str(e)
+    })
+    logger.error(f"Error {what} {word}: {err_type}: {e}", exc_info=True)
+
+
+def _map_relationships(entries: List[tuple]):
+    """Maps relationships for all learned words in one batched pass (gracefully skips if it fails)."""
     try:
-        unknown_words = get_unknown_words()
-        if not unknown_words:
-            results["status"] = "no_unknowns"
+        find_and_map_relationships_bulk([entry[0] for entry in entries])
+    except Exception as e:
+        logger.debug(f"Could not map relationships: {e}")
+
+
+async def _quick_learn_one(word: str, semaphore: asyncio.Semaphore, results: Dict):
+    """Learns one word; returns a (word, explanation, category) entry or None.
+
+    Words explained from web research come back with category None and are
+    categorized together afterwards; Groq-synthesized ones are already categorized.
+    """
+    async with semaphore:
+        logger.info(f"Learning unknown concept: {word}")
+        try:
+            # Quick research via web
+            explanation = await asyncio.to_thread(quick_research, word)
+            category = None
+
+            # If research failed, synthesize (and categorize) with Groq
+            if not explanation:
+                logger.info(f"No research results for {word}, synthesizing with Groq...")
+                explanation, category = await asyncio.to_thread(
+                    _synthesize_with_category, word, "You are a quick explainer.", "1-2 sentences")
+
+            if not explanation:
+                results["errors"].append(f"{word}: No explanation available")
+                return None
+
+            logger.info(f"✅ Learned: {word}")
+            return (word, explanation, category)
+
+        except Exception as e:
+            _record_error(results, word, e, "learning")
+            return None
+
+
+def _parse_llm_json(resp: str, expected: type = list):
+    """Parses a JSON array (or object, with expected=dict) from an LLM reply,
+    tolerating text around it; None if there is none."""
+    try:
+        parsed = orjson.loads(resp)
+    except orjson.JSONDecodeError:
+        # attempt to locate the JSON value in response
+        opening, closing = ('[', ']') if expected is list else ('{', '}')
+        start, end = resp.find(opening), resp.rfind(closing)
+        if start == -1 or end <= start:
+            return None
+        try:
+            parsed = orjson.loads(resp[start:end + 1])
+        except orjson.JSONDecodeError:
+            return None
+    return parsed if isinstance(parsed, expected) else None
+
+
+def _synthesize_with_category(word: str, persona: str, length: str):
+    """Explains and categorizes `word` in one Groq request.
+
+    Returns (explanation, category); (None, None) if nothing usable came back.
+    A reply that isn't the requested JSON is still used as the explanation.
+    """
+    system_prompt = (f"{persona} Respond with only a JSON object with keys: explanation "
+                     f"({length}), category (one of {', '.join(CATEGORIES)}).")
+    try:
+        resp = groq_generate_text(system_prompt, f"Explain '{word}'.")
+    except Exception as e:
+        logger.debug(f"Could not synthesize {word}: {e}")
+        return None, None
+    if not resp or resp in (GROQ_UNAVAILABLE_RESPONSE, GROQ_FAILED_RESPONSE):
+        return None, None
+    parsed = _parse_llm_json(resp, dict)
+    if parsed is None:
+        return resp, None
+    explanation = str(parsed.get("explanation") or "").strip()
+    category = str(parsed.get("category") or "").strip()
+    if not explanation:
+        return None, None
+    logger.info(f"✅ Synthesized explanation for {word} with Groq")
+    return explanation, (category if category in CATEGORIES else None)
+
+
+def _categorize_batch(learned: List[tuple]) -> List[tuple]:
+    """Categorizes every (word, explanation) pair with a single Groq request.
+
+    Words the reply leaves out or puts outside CATEGORIES (or an unparseable
+    reply) get DEFAULT_CATEGORY.
+    Returns (word, explanation, category) entries.
+    """
+    system_prompt = (f"Classify each text into: {', '.join(CATEGORIES)}. "
+                     "Respond with only a JSON array of objects with keys: word, category.")
+    items = orjson.dumps([{"word": word, "text": explanation[:500]} for word, explanation in learned]).decode()
+    categories = {}
+    try:
+        parsed = _parse_llm_json(groq_generate_text(system_prompt, f"Items: {items}")) or []
+        categories = {str(item.get("word")): str(item.get("category", "")).strip()
+                      for item in parsed if isinstance(item, dict)}
+    except Exception as e:
+        logger.debug(f"Batch categorization failed: {e}")
+    return [(word, explanation,
+             categories.get(word) if categories.get(word) in CATEGORIES else DEFAULT_CATEGORY)
+            for word, explanation in learned]
+
+
+async def _quick_learn_all(words: List[str], results: Dict) -> List[tuple]:
+    semaphore = asyncio.Semaphore(LEARN_CONCURRENCY)
+    learned = await asyncio.gather(*(_quick_learn_one(word, semaphore, results) for word in words))
+    learned = [entry for entry in learned if entry]
+    uncategorized = [(word, explanation) for word, explanation, category in learned if not category]
+    if not uncategorized:
+        return learned
+    # Use Groq for fast categorization: one request for the whole cycle
+    categorized = await asyncio.to_thread(_categorize_batch, uncategorized)
+    return [entry for entry in learned if entry[2]] + categorized
+
+
+async def quick_learn_unknowns_async() -> Dict:
+    """Quick learning of unknown concepts using Groq. Runs on the brain.scheduler loop."""
+    if _cycle_lock.locked():
+        return {"status": "skipped", "reason": "A learning cycle is already running"}
+
+    async with _cycle_lock:
+        logger.info("🚀 Starting quick learning cycle...")
+
+        results = {
+            "status": "started",
+            "learned_count": 0,
+            "errors": [],
+            "timestamp": datetime.now().isoformat()
+        }
+
+        try:
+            unknown_words = await asyncio.to_thread(get_unknown_words)
+            if not unknown_words:
+                results["status"] = "no_unknowns"
+                return results
+
+            # Learn top 3 unknowns per cycle, concurrently; learned words are
+            # written to Firestore together afterwards
+            words = [word_doc.id for word_doc in unknown_words[:3]]
+            to_promote = await _quick_learn_all(words, results)
+
+            if to_promote:
+                # Only words actually written to known_words count as learned
+                results["learned_count"] = await asyncio.to_thread(promote_words_to_known, to_promote)
+                await asyncio.to_thread(_map_relationships, to_promote)
+
+            results["status"] = "completed"
             return results
-        
-        for word_doc in unknown_words[:3]:  # Learn top 3 unknowns per cycle
-            word = word_doc.id
-            logger.info(f"Learning unknown concept: {word}")
-            
-            try:
-                # Quick research via web
-                explanation = quick_research(word)
-                
-                # If research failed, synthesize with Groq
-                if not explanation:
-                    logger.info(f"No research results for {word}, synthesizing with Groq...")
+
+        except Exception as e:
+            results["status"] = "error"
+            results["errors"].append(str(e))
+            logger.error(f"Error in quick learning: {e}", exc_info=True)
+            return results
+
+
+def quick_learn_unknowns() -> Dict:
+    """Runs one quick learning cycle now and waits for its result."""
+    return submit(quick_learn_unknowns_async()).result()
+
+
+async def learning_scheduler():
+    """Runs a quick learning cycle every LEARNING_INTERVAL seconds, forever."""
+    while True:
+        _schedule["next_run"] = None  # a cycle is in progress
+        try:
+            _schedule["last_result"] = await quick_learn_unknowns_async()
+        except Exception as e:
+            logger.error(f"Scheduled quick learning failed: {e}", exc_info=True)
+        _schedule["next_run"] = time.time() + LEARNING_INTERVAL
+        await asyncio.sleep(LEARNING_INTERVAL)
+
+
+def start_learning_scheduler():
+    """Starts the quick-learning scheduler on the background loop; no-op if it is already running."""
+    global _scheduler_future
+    with _scheduler_start_lock:
+        if _scheduler_future is None or _scheduler_future.done():
+            _scheduler_future = submit(learning_scheduler())
+
+
+def get_learning_schedule() -> Dict:
+    """Returns the next scheduled run (epoch seconds, None while a cycle runs) and the last cycle's result."""
+    return dict(_schedule)
+
+
+async def _deep_learn_one(word: str, gemini_model, semaphore: asyncio.Semaphore, results: Dict):
+    """Deep-learns one unknown word; returns a (word, explanation, category) entry or None."""
+    async with semaphore:
+        logger.info(f"Deep learning unknown: {word}")
+        try:
+            explanation = None
+            category = None
+
+            # Step 1: Try Gemini research first
+            if gemini_model:
+                try:
+                    explanation = await research_new_concept_async(word, gemini_model)
+                except Exception as e:
+                    logger.warning(f"Gemini research failed for {word}: {e}, trying quick research")
+
+            # Step 2: If Gemini didn't work, try quick search
+            if not explanation:
+                explanation = await asyncio.to_thread(quick_research, word)
+
+            # Step 3: If research found nothing, use Groq to synthesize (and categorize) from general knowledge
+            if not explanation:
+                logger.info(f"No research results for {word}, synthesizing with Groq...")
+                explanation, category = await asyncio.to_thread(
+                    _synthesize_with_category, word,
+                    "You are an expert educator. Explain the term clearly and concisely, suitable for learning.",
+                    "2-3 sentences, including what it is and its main purpose or characteristics")
+
+            if not explanation:
+                results["errors"].append(f"{word}: No explanation could be generated")
+                return None
+
+            # Categorize, unless the Groq synthesis already did
+            if not category:
+                category = DEFAULT_CATEGORY
+                if gemini_model:
                     try:
-                        system_prompt = f"You are a quick explainer. Provide a brief explanation of '{word}'."
-                        prompt = f"Explain '{word}' in 1-2 sentences."
-                        explanation = groq_generate_text(system_prompt, prompt)
-                        if explanation:
-                            logger.info(f"✅ Synthesized explanation for {word} with Groq")
-                    except Exception as e:
-                        logger.debug(f"Could not synthesize {word}: {e}")
-                
-                if not explanation:
-                    results["errors"].append(f"{word}: No explanation available")
-                    continue
-                
-                # Use Groq for fast categorization
-                system_prompt = "Classify this text into: Factual, Conceptual, Procedural, or Adversarial. Respond with just the category."
-                category = groq_generate_text(system_prompt, f"Text: {explanation[:500]}")
-                
-                # Add to knowledge base
-                add_word(word, explanation, is_known=True, category=category.strip())
-                
-                # Try to map relationships (gracefully skip if fails)
+                        category = await categorize_text_async(explanation, gemini_model)
+                    except Exception:
+                        pass
+
+            logger.info(f"✅ Deep learned: {word}")
+            return (word, explanation, category)
+
+        except Exception as e:
+            _record_error(results, word, e, "deep learning")
+            return None
+
+
+async def _deepen_one(doc, gemini_model, semaphore: asyncio.Semaphore, results: Dict):
+    """Expands a known concept's explanation with Gemini."""
+    word = doc.id
+    async with semaphore:
+        logger.info(f"Deepening knowledge: {word}")
+        try:
+            current_data = doc.to_dict()
+            current_explanation = current_data.get('definition', '')
+
+            # Use Gemini to expand knowledge
+            if gemini_model:
                 try:
-                    find_and_map_relationships(word)
+                    expansion_prompt = f"""Expand and deepen this explanation of '{word}':
+Current: {current_explanation[:300]}
+
+Provide:
+1. More detailed explanation
+2. Practical applications
+3. Related concepts
+4. Common misconceptions"""
+
+                    expanded = (await gemini_model.generate_content_async(expansion_prompt)).text
+
+                    # Update knowledge
+                    await asyncio.to_thread(db.collection('solidified_knowledge').document(word).update, {
+                        'expanded_definition': expanded,
+                        'last_deepened': datetime.now().isoformat()
+                    })
+
+                    results["deepened_known"] += 1
+                    logger.info(f"✅ Deepened: {word}")
+
                 except Exception as e:
-                    logger.debug(f"Could not map relationships for {word}: {e}")
-                
-                results["learned_count"] += 1
-                logger.info(f"✅ Learned: {word}")
-                
-            except Exception as e:
-                err_type = e.__class__.__name__
-                error_msg = {
-                    "word": word,
-                    "type": err_type,
-                    "message": str(e)
-                }
-                results["errors"].append(error_msg)
-                logger.error(f"Error learning {word}: {err_type}: {e}", exc_info=True)
-        
-        results["status"] = "completed"
-        return results
-        
-    except Exception as e:
-        results["status"] = "error"
-        results["errors"].append(str(e))
-        logger.error(f"Error in quick learning: {e}", exc_info=True)
-        return results
+                    logger.debug(f"Could not deepen {word} with Gemini: {e}")
+
+        except Exception as e:
+            logger.debug(f"Error deepening {word}: {e}")
+
+
+async def _deep_learn_all(words: List[str], gemini_model, results: Dict) -> List[tuple]:
+    semaphore = asyncio.Semaphore(LEARN_CONCURRENCY)
+    learned = await asyncio.gather(*(_deep_learn_one(word, gemini_model, semaphore, results) for word in words))
+    return [entry for entry in learned if entry]
+
+
+async def _deepen_all(docs, gemini_model, results: Dict):
+    semaphore = asyncio.Semaphore(LEARN_CONCURRENCY)
+    await asyncio.gather(*(_deepen_one(doc, gemini_model, semaphore, results) for doc in docs))
 
 
 def deep_learning() -> Dict:
@@ -131,123 +350,27 @@ def deep_learning() -> Dict:
     try:
         # Get both known and unknown words for deep learning
         unknown_words = get_unknown_words()
+        gemini_model = get_gemini_model()
         
-        # Deep learn unknowns first
-        for word_doc in unknown_words:
-            word = word_doc.id
-            logger.info(f"Deep learning unknown: {word}")
-            
-            try:
-                explanation = None
-                
-                # Step 1: Try Gemini research first
-                if APP_CONFIG.GEMINI_API_KEY:
-                    try:
-                        genai.configure(api_key=APP_CONFIG.GEMINI_API_KEY)
-                        gemini_model = genai.GenerativeModel(APP_CONFIG.GEMINI_MODEL)
-                        explanation = research_new_concept(word, gemini_model)
-                    except Exception as e:
-                        logger.warning(f"Gemini research failed for {word}: {e}, trying quick research")
-                
-                # Step 2: If Gemini didn't work, try quick search
-                if not explanation:
-                    explanation = quick_research(word)
-                
-                # Step 3: If research found nothing, use Groq to synthesize from general knowledge
-                if not explanation:
-                    logger.info(f"No research results for {word}, synthesizing with Groq...")
-                    try:
-                        system_prompt = f"You are an expert educator. Provide a clear, concise explanation of '{word}' suitable for learning."
-                        prompt = f"Explain '{word}' in 2-3 sentences, including what it is and its main purpose or characteristics."
-                        explanation = groq_generate_text(system_prompt, prompt)
-                        
-                        if explanation:
-                            logger.info(f"✅ Synthesized explanation for {word} with Groq")
-                    except Exception as e:
-                        logger.debug(f"Could not synthesize explanation for {word}: {e}")
-                
-                if not explanation:
-                    results["errors"].append(f"{word}: No explanation could be generated")
-                    continue
-                
-                # Categorize
-                if APP_CONFIG.GEMINI_API_KEY:
-                    try:
-                        gemini_model = genai.GenerativeModel(APP_CONFIG.GEMINI_MODEL)
-                        category = categorize_text(explanation, gemini_model)
-                    except:
-                        category = "Conceptual"
-                else:
-                    category = "Conceptual"
-                
-                # Add to knowledge
-                add_word(word, explanation, is_known=True, category=category)
-                
-                # Try to map relationships (gracefully skip if fails)
-                try:
-                    find_and_map_relationships(word)
-                except Exception as e:
-                    logger.debug(f"Could not map relationships for {word}: {e}")
-                
-                results["learned_unknown"] += 1
-                logger.info(f"✅ Deep learned: {word}")
-                
-            except Exception as e:
-                err_type = e.__class__.__name__
-                error_msg = {
-                    "word": word,
-                    "type": err_type,
-                    "message": str(e)
-                }
-                results["errors"].append(error_msg)
-                logger.error(f"Error deep learning {word}: {err_type}: {e}", exc_info=True)
+        # Deep learn unknowns first, concurrently; learned words are written together afterwards
+        words = [word_doc.id for word_doc in unknown_words]
+        to_promote = submit(_deep_learn_all(words, gemini_model, results)).result()
+        
+        if to_promote:
+            results["learned_unknown"] = promote_words_to_known(to_promote)
+            _map_relationships(to_promote)
         
         # Now deepen knowledge on existing known concepts
         try:
             if db:
-                known_docs = db.collection('solidified_knowledge').limit(5).stream()
-                for doc in known_docs:
-                    word = doc.id
-                    if word in ['solidified_knowledge', '_default_', 'sentence_patterns']:
-                        continue
-                    
-                    logger.info(f"Deepening knowledge: {word}")
-                    
-                    try:
-                        current_data = doc.to_dict()
-                        current_explanation = current_data.get('definition', '')
-                        
-                        # Use Gemini to expand knowledge
-                        if APP_CONFIG.GEMINI_API_KEY:
-                            try:
-                                genai.configure(api_key=APP_CONFIG.GEMINI_API_KEY)
-                                gemini_model = genai.GenerativeModel(APP_CONFIG.GEMINI_MODEL)
-                                
-                                expansion_prompt = f"""Expand and deepen this explanation of '{word}':
-Current: {current_explanation[:300]}
-
-Provide:
-1. More detailed explanation
-2. Practical applications
-3. Related concepts
-4. Common misconceptions"""
-                                
-                                expanded = gemini_model.generate_content(expansion_prompt).text
-                                
-                                # Update knowledge
-                                db.collection('solidified_knowledge').document(word).update({
-                                    'expanded_definition': expanded,
-                                    'last_deepened': datetime.now().isoformat()
-                                })
-                                
-                                results["deepened_known"] += 1
-                                logger.info(f"✅ Deepened: {word}")
-                                
-                            except Exception as e:
-                                logger.debug(f"Could not deepen {word} with Gemini: {e}")
-                        
-                    except Exception as e:
-                        logger.debug(f"Error deepening {word}: {e}")
+                # Only 'definition' is read, and non-concept documents are filtered out server-side
+                collection = db.collection('solidified_knowledge')
+                query = (collection
+                         .where(FieldPath.document_id(), 'not-in', [collection.document(d) for d in NON_CONCEPT_DOC_IDS])
+                         .select(['definition'])
+                         .limit(5))
+                known_docs = list(query.stream())
+                submit(_deepen_all(known_docs, gemini_model, results)).result()
         
         except Exception as e:
             logger.error(f"Error accessing known concepts: {e}")
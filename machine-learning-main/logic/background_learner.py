@@ -1,21 +1,35 @@
 """Background learning tasks that run continuously to refine knowledge."""
 
+import asyncio
 import logging
 import time
 import json
-import threading
+import random
+from threading import RLock
 from typing import Optional, Dict
 from datetime import datetime, timedelta
 
+from cachetools import TTLCache
+
 # Import the new knowledge base module
-from brain.knowledge_base import refine_knowledge_entry, extract_related_topics
+from brain.knowledge_base import refine_knowledge_entry_async, extract_related_topics_async
+from brain.scheduler import submit
+from services.researcher import quick_research
+from services.ai_providers import _is_retryable
 
 logger = logging.getLogger(__name__)
 
-# Global state for background tasks
-_learning_tasks = {}  # topic -> learning state
-_refinement_timers = {}  # topic -> last refinement time
 REFINEMENT_INTERVAL = 300  # 5 minutes
+TASK_STATE_MAXSIZE = 1024
+TASK_STATE_TTL = REFINEMENT_INTERVAL * 4
+
+# Global state for background tasks. Bounded and expiring so a long-running
+# process doesn't accumulate every topic it has ever seen; guarded by _lock.
+_lock = RLock()
+_learning_tasks = TTLCache(maxsize=TASK_STATE_MAXSIZE, ttl=TASK_STATE_TTL)  # topic -> learning state
+_refinement_timers = TTLCache(maxsize=TASK_STATE_MAXSIZE, ttl=TASK_STATE_TTL)  # topic -> next refinement time
+REFINEMENT_POLL_SECONDS = 10
+RECOVERY_BACKOFF_CAP = 60  # seconds
 
 
 def schedule_refinement_task(topic: str, response_text: str, knowledge_data: Dict):
@@ -28,40 +42,27 @@ def schedule_refinement_task(topic: str, response_text: str, knowledge_data: Dic
         response_text: The current response
         knowledge_data: Current knowledge entry for the topic
     """
-    global _learning_tasks, _refinement_timers
-    
-    # Store the main task
-    _learning_tasks[topic] = {
-        "response": response_text,
-        "knowledge": knowledge_data,
-        "created_at": time.time(),
-        "status": "pending",
-        "related_topics": []
-    }
-    
-    # Set timer for next refinement
-    _refinement_timers[topic] = datetime.now() + timedelta(seconds=REFINEMENT_INTERVAL)
+    with _lock:
+        # Store the main task
+        _learning_tasks[topic] = {
+            "response": response_text,
+            "knowledge": knowledge_data,
+            "created_at": time.time(),
+            "status": "pending",
+            "related_topics": []
+        }
+        
+        # Set timer for next refinement
+        _refinement_timers[topic] = datetime.now() + timedelta(seconds=REFINEMENT_INTERVAL)
     
     logger.info(f"Scheduled refinement task for: {topic}")
     
-    # Start refinement in background thread (non-blocking)
-    thread = threading.Thread(
-        target=_run_refinement_task,
-        args=(topic,),
-        daemon=True
-    )
-    thread.start()
-    
-    # Also schedule learning for related topics (in separate thread)
-    thread = threading.Thread(
-        target=_schedule_related_topics_learning,
-        args=(topic, response_text),
-        daemon=True
-    )
-    thread.start()
+    # Both run as coroutines on the shared scheduler loop (non-blocking)
+    submit(_run_refinement_task(topic))
+    submit(_schedule_related_topics_learning(topic, response_text))
 
 
-def _schedule_related_topics_learning(topic: str, response_text: str):
+async def _schedule_related_topics_learning(topic: str, response_text: str):
     """Extract and schedule learning for related topics.
     
     Args:
@@ -69,46 +70,71 @@ def _schedule_related_topics_learning(topic: str, response_text: str):
         response_text: Response text containing related topics
     """
     try:
-        related = extract_related_topics(response_text)
-        if related:
-            _learning_tasks[topic]["related_topics"] = related
-            logger.info(f"Found {len(related)} related topics for '{topic}': {related}")
+        related = await extract_related_topics_async(response_text)
+        if not related:
+            return
+        with _lock:
+            task = _learning_tasks.get(topic)
+            if task is None:
+                return
+            task["related_topics"] = related
+        logger.info(f"Found {len(related)} related topics for '{topic}': {related}")
+
+        # Related topics are independent, so research them concurrently
+        results = await asyncio.gather(*(_learn_one_topic(t) for t in related), return_exceptions=True)
+        learned = {t: r for t, r in zip(related, results) if isinstance(r, str) and r}
+        with _lock:
+            task = _learning_tasks.get(topic)
+            if task is not None:
+                task["related_knowledge"] = learned
+        logger.info(f"Learned {len(learned)}/{len(related)} related topics for '{topic}'")
     
     except Exception as e:
         logger.error(f"Error scheduling related topics learning: {e}", exc_info=True)
 
 
-def _run_refinement_task(topic: str):
+async def _learn_one_topic(related_topic: str) -> str:
+    """Research a single related topic without blocking the scheduler loop."""
+    return await asyncio.to_thread(quick_research, related_topic)
+
+
+async def _run_refinement_task(topic: str):
     """Run refinement task in background (every 5 minutes)."""
-    global _learning_tasks, _refinement_timers
-    
     try:
-        while topic in _learning_tasks:
-            task = _learning_tasks[topic]
+        while True:
+            with _lock:
+                task = _learning_tasks.get(topic)
+                due = datetime.now() >= _refinement_timers.get(topic, datetime.now())
+            if task is None:
+                break
             
             # Check if it's time to refine
-            if datetime.now() >= _refinement_timers.get(topic, datetime.now()):
+            if due:
                 logger.info(f"Running refinement task for: {topic}")
                 
                 try:
-                    improved = refine_knowledge_entry(topic, task["knowledge"])
+                    improved = await refine_knowledge_entry_async(topic, task["knowledge"])
                     
-                    if improved:
-                        task["status"] = "refined"
-                        task["refined_at"] = time.time()
-                        logger.info(f"Successfully refined knowledge for: {topic}")
-                    
-                    # Reschedule for next 5 minutes
-                    _refinement_timers[topic] = datetime.now() + timedelta(seconds=REFINEMENT_INTERVAL)
+                    with _lock:
+                        if improved:
+                            task["status"] = "refined"
+                            task["refined_at"] = time.time()
+                            logger.info(f"Successfully refined knowledge for: {topic}")
+                        
+                        # Reschedule for next 5 minutes; re-inserting keeps a live topic from expiring
+                        if topic in _learning_tasks:
+                            _learning_tasks[topic] = task
+                            _refinement_timers[topic] = datetime.now() + timedelta(seconds=REFINEMENT_INTERVAL)
                 
                 except Exception as e:
                     logger.error(f"An error occurred during knowledge refinement for topic '{topic}'.", exc_info=True)
-                    task["status"] = "error"
+                    with _lock:
+                        task["status"] = "error"
                     # Stop retrying this task to prevent a loop of failures
                     break
             
             # Sleep before checking again
-            time.sleep(10)
+            await asyncio.sleep(REFINEMENT_POLL_SECONDS)
     
     except Exception as e:
         logger.error(f"The background refinement task for topic '{topic}' encountered a critical failure and has stopped.", exc_info=True)
@@ -133,18 +159,13 @@ def schedule_recovery_task(user_query: str, failed_response: str, max_attempts:
     
     logger.info(f"Scheduled recovery task for: {user_query[:50]}...")
     
-    # Start recovery in background thread
-    thread = threading.Thread(
-        target=_run_recovery_task,
-        args=(recovery_task,),
-        daemon=True
-    )
-    thread.start()
+    # Run recovery on the shared scheduler loop
+    submit(_run_recovery_task(recovery_task))
     
     return recovery_task
 
 
-def _run_recovery_task(task: Dict):
+async def _run_recovery_task(task: Dict):
     """Run recovery task: attempt to improve response."""
     try:
         for attempt in range(task["max_attempts"]):
@@ -152,17 +173,22 @@ def _run_recovery_task(task: Dict):
             logger.info(f"Recovery attempt {task['attempts']}/{task['max_attempts']} for: {task['query'][:50]}")
             
             try:
-                # Background recovery logic would go here
-                # For now, just mark as attempted
-                task["status"] = "attempted"
-                logger.info(f"Recovery attempted on attempt {task['attempts']}")
+                # Research and re-synthesis are dependent steps, so they run in order in a worker thread
+                from logic.rethink import rethink_and_learn
+                task["new_response"] = await asyncio.to_thread(rethink_and_learn, task["query"], task["failed_response"])
+                task["status"] = "recovered"
+                logger.info(f"Recovery succeeded on attempt {task['attempts']}")
                 return
             
             except Exception as e:
                 logger.debug(f"Recovery attempt {task['attempts']} error: {e}")
+                # Only transient failures (rate limits, timeouts, 5xx) are worth another attempt
+                if not (_is_retryable(e) or isinstance(e, (TimeoutError, ConnectionError))):
+                    break
             
-            # Wait before retry
-            time.sleep(5)
+            # Back off exponentially with jitter so concurrent recoveries don't retry in lockstep
+            if attempt + 1 < task["max_attempts"]:
+                await asyncio.sleep(min(RECOVERY_BACKOFF_CAP, 2 ** attempt + random.random()))
         
         task["status"] = "failed"
         logger.warning(f"Recovery failed after {task['attempts']} attempts")
@@ -174,16 +200,14 @@ def _run_recovery_task(task: Dict):
 
 def get_task_status(task_id: str) -> Optional[Dict]:
     """Get the status of a learning task."""
-    return _learning_tasks.get(task_id)
+    with _lock:
+        return _learning_tasks.get(task_id)
 
 
 def clear_task(topic: str):
     """Clear a learning task."""
-    global _learning_tasks, _refinement_timers
-    
-    if topic in _learning_tasks:
-        del _learning_tasks[topic]
-    if topic in _refinement_timers:
-        del _refinement_timers[topic]
+    with _lock:
+        _learning_tasks.pop(topic, None)
+        _refinement_timers.pop(topic, None)
     
     logger.info(f"Cleared task for: {topic}")
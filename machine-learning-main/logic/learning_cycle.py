@@ -1,77 +1,165 @@
 import os
+import asyncio
 import logging
-import google.generativeai as genai
+import functools
 import sys
 import nltk
+from concurrent.futures import ThreadPoolExecutor
 
-from config import APP_CONFIG
-from brain.db import get_unknown_words, add_word, is_known
-from services.services import db
-from services.researcher import research_new_concept
-from utils.categorizer import categorize_text
-from utils.relationship_mapper import find_and_map_relationships
+from brain.scheduler import submit
+from brain.db import get_unknown_words, add_word, is_known, promote_words_to_known, UNKNOWN_WORDS_COLLECTION, WRITE_BATCH_MAX_OPS
+from services.services import db, get_gemini_model
+from services.researcher import research_new_concept_async
+from utils.categorizer import categorize_text_async
+from utils.relationship_mapper import find_and_map_relationships_bulk
 from utils.dictionary_validator import is_valid_word_api
+from scripts.seed_knowledge import FOUNDATIONAL_CONCEPTS, COMMON_WORDS
 
 # Get logger
 logger = logging.getLogger(__name__)
 
+# Dictionary lookups are plain HTTP requests, so they run concurrently.
+VALIDATION_WORKERS = 32
+
+# Words the bootstrap already defines; these are promoted with the seeded
+# definition instead of going through the dictionary API and Gemini.
+_BOOTSTRAP_DEFINITIONS = {
+    **COMMON_WORDS,
+    **{concept: data.get("definition", "") for concept, data in FOUNDATIONAL_CONCEPTS.items()},
+}
+
 # --- Gemini API Configuration ---
-gemini_api_key = APP_CONFIG.GEMINI_API_KEY
-if gemini_api_key:
-    try:
-        genai.configure(api_key=gemini_api_key)
-        gemini_model = genai.GenerativeModel(APP_CONFIG.GEMINI_MODEL)
-        logger.info("Gemini API configured successfully for learning cycle.")
-    except Exception as e:
-        logger.critical(f"Failed to configure Gemini API: {e}", exc_info=True)
-        gemini_model = None
-else:
-    logger.warning("GEMINI_API_KEY not found. Learning cycle cannot define new words.")
-    gemini_model = None
+@functools.lru_cache(maxsize=1)
+def _get_model():
+    """Returns the shared Gemini model, warning once if it is unavailable."""
+    model = get_gemini_model()
+    if model is None:
+        logger.warning("Gemini is not configured. Learning cycle cannot define new words.")
+    return model
 
 # --- Learning Cycle Logic --- #
+_WORDNET_READY = False
+
+
+def _ensure_wordnet():
+    """Downloads WordNet if it is missing; checked once per process, not per cycle."""
+    global _WORDNET_READY
+    if _WORDNET_READY:
+        return
+    try:
+        nltk.data.find('corpora/wordnet.zip')
+    except LookupError:
+        logger.info("WordNet not found. Downloading...")
+        if not nltk.download('wordnet', quiet=True, raise_on_error=False):
+            # Relationship mapping skips itself without WordNet; retry next cycle
+            logger.warning("WordNet download failed; continuing without it.")
+            return
+        logger.info("WordNet downloaded successfully.")
+    _WORDNET_READY = True
+
+# Research (web search + Gemini synthesis) and categorization run as two
+# overlapping stages joined by a bounded queue; storing and relationship
+# mapping then happen once, in bulk, for everything that was researched.
+RESEARCH_CONCURRENCY = 8
+PIPELINE_QUEUE_SIZE = 8
+
+
+async def _research_stage(words, model, queue: asyncio.Queue):
+    """Researches words concurrently (at most RESEARCH_CONCURRENCY at a time) and queues the results."""
+    semaphore = asyncio.Semaphore(RESEARCH_CONCURRENCY)
+
+    async def research(word):
+        async with semaphore:
+            logger.info(f"Researching new concept: {word}")
+            try:
+                explanation = await research_new_concept_async(word, model)
+            except Exception as e:
+                logger.error(f"Research raised for '{word}': {e}", exc_info=True)
+                explanation = ""
+        await queue.put((word, explanation))
+
+    try:
+        await asyncio.gather(*(research(word) for word in words))
+    finally:
+        await queue.put(None)
+
+
+async def _categorize_stage(model, queue: asyncio.Queue, researched: list):
+    """Categorizes researched words as they arrive, appending (word, explanation, category)."""
+    while (item := await queue.get()) is not None:
+        word, explanation = item
+        if not explanation:
+            logger.warning(f"Research failed for '{word}'.")
+            continue
+        logger.info(f"Successfully researched '{word}'. Categorizing.")
+        try:
+            category = await categorize_text_async(explanation, model)
+        except Exception as e:
+            logger.error(f"Error categorizing '{word}': {e}", exc_info=True)
+            category = None
+        researched.append((word, explanation, category))
+
+
+async def _run_learning_pipeline(words, model) -> list:
+    """Researches and categorizes `words`; returns the (word, explanation, category) results."""
+    queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    researched = []
+    await asyncio.gather(_research_stage(words, model, queue), _categorize_stage(model, queue, researched))
+    return researched
+
+
 def trigger_learning_cycle():
     """This function is called to run the learning cycle.
     It can be triggered by a scheduler or run directly.
     """
     logger.info("Starting new learning cycle...")
     try:
-        # Download WordNet if not already downloaded
-        try:
-            nltk.data.find('corpora/wordnet.zip')
-        except LookupError:
-            logger.info("WordNet not found. Downloading...")
-            nltk.download('wordnet')
-            logger.info("WordNet downloaded successfully.")
+        _ensure_wordnet()
 
         unknown_words = get_unknown_words()
         if not unknown_words:
             logger.info("No unknown words to process.")
             return
 
+        # One pass splits the words into seeded ones and ones that need validating
+        seeded, words = [], []
         for word_doc in unknown_words:
-            word = word_doc.id
+            definition = _BOOTSTRAP_DEFINITIONS.get(word_doc.id)
+            if definition is not None:
+                seeded.append((word_doc.id, definition, None))
+            else:
+                words.append(word_doc.id)
+        if seeded:
+            logger.info(f"Promoting {len(seeded)} bootstrap-defined words without research.")
+            promote_words_to_known(seeded)
 
-            if not is_valid_word_api(word):
-                logger.warning(f"'{word}' is not a valid English word according to the API. Skipping and removing.")
-                db.collection('unknown_words').document(word).delete()
-                continue
+        valid_map = {}
+        if words:
+            with ThreadPoolExecutor(max_workers=min(VALIDATION_WORKERS, len(words))) as executor:
+                valid_map = dict(zip(words, executor.map(is_valid_word_api, words)))
 
-            if not gemini_model:
+        invalid = [word for word, ok in valid_map.items() if not ok]
+        for word in invalid:
+            logger.warning(f"'{word}' is not a valid English word according to the API. Skipping and removing.")
+        for i in range(0, len(invalid), WRITE_BATCH_MAX_OPS):
+            batch = db.batch()
+            for word in invalid[i:i + WRITE_BATCH_MAX_OPS]:
+                batch.delete(db.collection(UNKNOWN_WORDS_COLLECTION).document(word))
+            batch.commit()
+
+        valid = [word for word, ok in valid_map.items() if ok]
+        model = _get_model() if valid else None
+        if valid and not model:
+            for word in valid:
                 logger.warning(f"Skipping research for '{word}' because Gemini API is not configured.")
-                continue
-                
-            logger.info(f"Researching new concept: {word}")
-            
-            explanation = research_new_concept(word, gemini_model)
-
-            if explanation:
-                logger.info(f"Successfully researched '{word}'. Categorizing and updating knowledge base.")
-                category = categorize_text(explanation, gemini_model)
-                add_word(word, explanation, is_known=True, category=category) 
-                find_and_map_relationships(word)
-            else:
-                logger.warning(f"Research failed for '{word}'.")
+        elif model:
+            # Runs on the shared scheduler loop: the async Gemini client binds to
+            # the first loop it is used on, so a fresh asyncio.run() per cycle won't do
+            researched = submit(_run_learning_pipeline(valid, model)).result()
+            if researched:
+                # One batched write for all new words, then one relationship pass
+                promote_words_to_known(researched)
+                find_and_map_relationships_bulk([word for word, _, _ in researched])
 
         logger.info("Learning cycle finished.")
     except Exception as e:
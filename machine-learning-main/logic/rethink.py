@@ -1,8 +1,7 @@
 import logging
 from services.researcher import quick_research, research_new_concept
 from services.ai_providers import groq_generate_text
-from config import APP_CONFIG
-import google.generativeai as genai
+from services.services import get_gemini_model
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +28,9 @@ def rethink_and_learn(original_prompt: str, incorrect_answer: str) -> str:
         # Try Gemini first for quality research
         new_research = None
         
-        if APP_CONFIG.GEMINI_API_KEY:
+        gemini_model = get_gemini_model()
+        if gemini_model:
             try:
-                genai.configure(api_key=APP_CONFIG.GEMINI_API_KEY)
-                gemini_model = genai.GenerativeModel(APP_CONFIG.GEMINI_MODEL)
                 new_research = research_new_concept(original_prompt, gemini_model)
             except Exception as e:
                 logger.warning(f"Gemini research failed, falling back to quick research: {e}")
@@ -69,10 +67,9 @@ def rethink_and_learn(original_prompt: str, incorrect_answer: str) -> str:
 
         # Try Gemini first for better quality
         new_answer = None
-        if APP_CONFIG.GEMINI_API_KEY:
+        gemini_model = get_gemini_model()
+        if gemini_model:
             try:
-                genai.configure(api_key=APP_CONFIG.GEMINI_API_KEY)
-                gemini_model = genai.GenerativeModel(APP_CONFIG.GEMINI_MODEL)
                 response = gemini_model.generate_content(final_prompt)
                 new_answer = response.text
                 logger.info("✅ Rethink synthesis with Gemini successful")
@@ -1,5 +1,5 @@
 import logging
-from brain.db import is_known, add_word
+from brain.db import are_known, add_word
 from services.researcher import quick_research
 from services.ai_providers import groq_generate_text
 from services.services import nlp
@@ -22,12 +22,15 @@ def process_prompt(prompt: str):
         doc = nlp(prompt)
         concepts = [chunk.text for chunk in doc.noun_chunks]
         if not concepts:
-            concepts = [token.text for token in doc if hasattr(token, 'is_poun') and token.is_poun and not token.is_stop]
+            concepts = [token.text for token in doc if token.pos_ in ("NOUN", "PROPN") and not token.is_stop]
+        # Repeated concepts would only repeat the lookups and writes below
+        concepts = list(dict.fromkeys(concepts))
 
         logger.info(f"Identified concepts: {concepts}")
 
-        # 2. Check which concepts are unknown
-        unknown_concepts = [concept for concept in concepts if not is_known(concept)]
+        # 2. Check which concepts are unknown (one batched read for all of them)
+        known = are_known(concepts)
+        unknown_concepts = [concept for concept in concepts if not known[concept]]
         
         if not unknown_concepts:
             yield "All concepts are known. Generating response..."
@@ -3,10 +3,12 @@
 Writes per-word JSON lines to `data/enriched.jsonl` and optionally to Firestore
 collections `known_words` and `solidified_knowledge` when Firestore is configured.
 """
+import asyncio
 import json
+import logging
 import os
+import time
 from pathlib import Path
-from time import sleep
 try:
     from services.ai_providers import groq_generate_text
     from services.services import groq_client, db
@@ -16,10 +18,13 @@ except Exception:
     db = None
 
 try:
-    from brain.db import add_word
+    from brain.db import promote_words_to_known, is_valid_doc_id, WRITE_BATCH_MAX_OPS
 except Exception:
-    def add_word(word, explanation, is_known=False, category=None):
-        return None
+    def promote_words_to_known(items):
+        return 0
+    WRITE_BATCH_MAX_OPS = 450
+
+logger = logging.getLogger(__name__)
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -27,7 +32,9 @@ CANDIDATES_FILE = DATA_DIR / "candidates.json"
 OUT_FILE = DATA_DIR / "enriched.jsonl"
 
 BATCH_SIZE = int(os.environ.get('BATCH_SIZE', 25))
-DELAY_BETWEEN_BATCHES = float(os.environ.get('DELAY_BETWEEN_BATCHES', 0.5))
+# Batches in flight at once, and the Groq requests-per-minute ceiling they share
+ENRICH_CONCURRENCY = int(os.environ.get('ENRICH_CONCURRENCY', 4))
+GROQ_RPM = float(os.environ.get('GROQ_RPM', 30))
 
 
 def load_candidates():
@@ -77,24 +84,80 @@ def enrich_batch(words):
     return parsed
 
 
-def persist_entry(entry):
+def persist_entries(entries):
+    """Saves a batch of enriched entries: one file append, batched Firestore writes."""
     # Save to local file
     with OUT_FILE.open('a', encoding='utf-8') as f:
-        f.write(json.dumps(entry) + "\n")
-
-    # Try to persist to Firestore if available
+        f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    if not db:
+        return
+    entries = [e for e in entries if isinstance(e, dict)]
+    # One word that isn't a valid document id would fail its whole batch
+    invalid = [e.get('word') for e in entries if not is_valid_doc_id(e.get('word'))]
+    if invalid:
+        logger.warning(f"Skipping Firestore writes for invalid document ids: {invalid}")
+        entries = [e for e in entries if is_valid_doc_id(e.get('word'))]
+    if not entries:
+        return
+
+    # add to known_words in WriteBatches via brain.db.promote_words_to_known
     try:
-        if db:
-            # add to known_words via brain.db.add_word
-            add_word(entry['word'], entry.get('definition', ''), is_known=True, category=entry.get('category'))
-            # store solidified enrichment
-            doc = db.collection('solidified_knowledge').document(entry['word'])
-            doc.set({
-                'enrichment': entry,
-                'source': 'batch_enrich',
-            })
-    except Exception:
-        pass
+        promote_words_to_known([(e['word'], e.get('definition', ''), e.get('category')) for e in entries])
+    except Exception as e:
+        logger.error(f"Failed to promote {len(entries)} enriched words: {e}", exc_info=True)
+
+    # store solidified enrichment
+    collection = db.collection('solidified_knowledge')
+    for i in range(0, len(entries), WRITE_BATCH_MAX_OPS):
+        chunk = entries[i:i + WRITE_BATCH_MAX_OPS]
+        try:
+            batch = db.batch()
+            for entry in chunk:
+                batch.set(collection.document(entry['word']), {
+                    'enrichment': entry,
+                    'source': 'batch_enrich',
+                })
+            batch.commit()
+        except Exception as e:
+            logger.error(f"Failed to store {len(chunk)} enrichment docs: {e}", exc_info=True)
+
+
+class RateLimiter:
+    """Spaces request starts at least 60/rpm seconds apart across all workers."""
+
+    def __init__(self, rpm: float):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def enrich_all(candidates):
+    semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    limiter = RateLimiter(GROQ_RPM)
+    persist_lock = asyncio.Lock()
+
+    async def run(number, batch):
+        async with semaphore:
+            await limiter.wait()
+            print(f"Enriching batch {number}: {len(batch)} words")
+            enriched = await asyncio.to_thread(enrich_batch, batch)
+        # Writes stay serialized so file lines from different batches don't interleave
+        async with persist_lock:
+            await asyncio.to_thread(persist_entries, enriched)
+
+    await asyncio.gather(*(
+        run(i // BATCH_SIZE + 1, candidates[i:i + BATCH_SIZE])
+        for i in range(0, len(candidates), BATCH_SIZE)
+    ))
 
 
 def main():
@@ -102,14 +165,7 @@ def main():
     candidates = load_candidates()
     print(f"Loaded {len(candidates)} candidates")
 
-    # chunk
-    for i in range(0, len(candidates), BATCH_SIZE):
-        batch = candidates[i:i+BATCH_SIZE]
-        print(f"Enriching batch {i//BATCH_SIZE + 1}: {len(batch)} words")
-        enriched = enrich_batch(batch)
-        for e in enriched:
-            persist_entry(e)
-        sleep(DELAY_BETWEEN_BATCHES)
+    asyncio.run(enrich_all(candidates))
 
     print(f"Enrichment complete. Results in {OUT_FILE}")
 
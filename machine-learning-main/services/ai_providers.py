@@ -1,20 +1,96 @@
 import logging
+import functools
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from services.services import groq_client
 from config import APP_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# HTTP statuses (and SDK exception names) worth retrying: rate limits and
+# transient server-side failures. Anything else (auth, bad request) fails fast.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+RETRYABLE_EXCEPTION_NAMES = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "TooManyRequests",
+}
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """Returns True if a provider exception looks transient, by status code or by class name."""
+    if exc.__class__.__name__ in RETRYABLE_EXCEPTION_NAMES:
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return isinstance(status, int) and status in RETRYABLE_STATUS_CODES
+
+
+def retry_with_backoff(max_retries: int = APP_CONFIG.PROVIDER_MAX_RETRIES, base: float = 1.0,
+                       cap: float = 30.0, jitter: float = 0.5):
+    """Retries the wrapped call on transient errors with capped exponential backoff.
+
+    Sleeps `min(cap, base * 2**attempt) + uniform(0, jitter)` between attempts.
+    Non-retryable errors, and the last retryable one, are re-raised to the caller.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    if attempt >= max_retries or not _is_retryable(e):
+                        raise
+                    delay = min(cap, base * 2 ** attempt) + random.uniform(0, jitter)
+                    logger.warning(f"{fn.__name__} failed ({e.__class__.__name__}); retrying in {delay:.1f}s "
+                                   f"(attempt {attempt + 1}/{max_retries})")
+                    time.sleep(delay)
+                    attempt += 1
+        return wrapper
+    return decorator
+
+
+_DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+def _mk_msgs(system: str, user: str) -> list:
+    """Builds the two-message chat payload used for every Groq request."""
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+@retry_with_backoff()
+def _gemini_generate(prompt, max_output_tokens: int = APP_CONFIG.GEMINI_MAX_OUTPUT_TOKENS):
+    import google.generativeai as genai
+
+    model = genai.GenerativeModel(
+        APP_CONFIG.GEMINI_MODEL,
+        generation_config={'max_output_tokens': max_output_tokens}
+    )
+    resp = model.generate_content(prompt, request_options={'timeout': APP_CONFIG.PROVIDER_TIMEOUT})
+    return resp.text
+
+
+@retry_with_backoff()
+def _groq_chat(messages, max_tokens: int = None):
+    kwargs = {'max_tokens': max_tokens} if max_tokens else {}
+    resp = groq_client.chat.completions.create(
+        messages=messages,
+        model=APP_CONFIG.GROQ_MODEL,
+        **kwargs
+    )
+    return resp.choices[0].message.content
+
+
 def _try_gemini(prompt):
     """Attempts to generate content using the Gemini API's chat functionality."""
-    import google.generativeai as genai
-    
     if not APP_CONFIG.GEMINI_API_KEY:
         logger.warning("Gemini provider not configured. Skipping.")
         return None
     try:
-        model = genai.GenerativeModel(APP_CONFIG.GEMINI_MODEL)
-        resp = model.generate_content(prompt)
-        return resp.text
+        return _gemini_generate(prompt)
     except Exception as e:
         logger.error(f"Gemini provider failed: {e}", exc_info=True)
         return None
@@ -25,80 +101,175 @@ def _try_groq(prompt):
     if not groq_client:
         logger.warning("Groq provider not configured. Skipping.")
         return None
+    try:
+        return _groq_chat(_mk_msgs(_DEFAULT_SYSTEM_PROMPT, prompt))
+    except Exception as e:
+        logger.error(f"Groq provider failed: {e}", exc_info=True)
+        return None
 
+def _try_ignis(prompt):
+    """Attempt to call an Ignis endpoint (a local or remote model API).
 
-    def _try_ignis(prompt):
-        """Attempt to call an Ignis endpoint (a local or remote model API).
-
-        Expects APP_CONFIG.IGNIS_API_URL to be set to an HTTP endpoint that accepts
-        JSON {"prompt": "..."} and returns JSON {"response": "..."}.
-        """
-        url = getattr(APP_CONFIG, 'IGNIS_API_URL', None)
-        if not url:
-            return None
-        try:
-            import requests
-            resp = requests.post(url, json={'prompt': prompt}, timeout=15)
-            if resp.status_code == 200:
-                data = resp.json()
-                return data.get('response') or data.get('text') or resp.text
-            return None
-        except Exception as e:
-            logger.error(f"Ignis provider failed: {e}", exc_info=True)
-            return None
+    Expects APP_CONFIG.IGNIS_API_URL to be set to an HTTP endpoint that accepts
+    JSON {"prompt": "..."} and returns JSON {"response": "..."}.
+    """
+    url = getattr(APP_CONFIG, 'IGNIS_API_URL', None)
+    if not url:
+        return None
     try:
-        messages = [
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ]
-        resp = groq_client.chat.completions.create(
-            messages=messages, 
-            model=APP_CONFIG.GROQ_MODEL
-        )
-        return resp.choices[0].message.content
+        import requests
+        resp = requests.post(url, json={'prompt': prompt}, timeout=15)
+        if resp.status_code == 200:
+            data = resp.json()
+            return data.get('response') or data.get('text') or resp.text
+        return None
     except Exception as e:
-        logger.error(f"Groq provider failed: {e}", exc_info=True)
+        logger.error(f"Ignis provider failed: {e}", exc_info=True)
         return None
 
-def groq_generate_text(system_prompt: str, user_prompt: str):
+# Fixed replies from groq_generate_text when no text could be generated.
+GROQ_UNAVAILABLE_RESPONSE = "Groq provider is not available."
+GROQ_FAILED_RESPONSE = "I am having trouble accessing my knowledge base at the moment."
+_groq_missing_warned = False
+
+
+def groq_generate_text(system_prompt: str, user_prompt: str, max_tokens: int = None):
     """Generates a response from Groq using a system and user prompt.
 
+    Transient failures (rate limits, 5xx) are retried with exponential backoff.
+
     Args:
         system_prompt: The system-level instruction for the model.
         user_prompt: The user's query or prompt.
+        max_tokens: Optional cap on the number of generated tokens.
 
     Returns:
         The generated text as a string, or a default message if it fails.
     """
+    global _groq_missing_warned
     if not groq_client:
-        logger.warning("Groq provider not configured. Cannot generate text.")
-        return "Groq provider is not available."
+        # Background refinement can call this thousands of times; warn once
+        if not _groq_missing_warned:
+            _groq_missing_warned = True
+            logger.warning("Groq provider not configured. Cannot generate text.")
+        return GROQ_UNAVAILABLE_RESPONSE
     try:
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-        resp = groq_client.chat.completions.create(
-            messages=messages, 
-            model=APP_CONFIG.GROQ_MODEL
-        )
-        return resp.choices[0].message.content
+        return _groq_chat(_mk_msgs(system_prompt, user_prompt), max_tokens=max_tokens)
     except Exception as e:
         logger.error(f"Groq provider failed: {e}", exc_info=True)
-        return "I am having trouble accessing my knowledge base at the moment."
+        return GROQ_FAILED_RESPONSE
+
+# Single-flight map for generate_text: key -> (future, finished_at). Concurrent
+# identical calls share one upstream request, and a finished result is reused
+# for COALESCE_TTL seconds before being evicted.
+COALESCE_TTL = 5.0
+_inflight = {}
+_inflight_lock = threading.Lock()
 
-def generate_text(prompt, prefer=None):
+
+def generate_text(prompt, prefer=None, hedged=None):
     """Generate text from available providers, with fallback.
 
+    Identical (prompt, prefer) calls made while one is in flight, or within
+    COALESCE_TTL seconds of it finishing, share its result instead of issuing
+    another provider request.
+
     Args:
         prompt: The input prompt for the AI.
         prefer: A tuple or list specifying the preferred order of providers (e.g., ('gemini', 'groq')).
+        hedged: Race providers concurrently and return the first success
+            (defaults to APP_CONFIG.PROVIDER_HEDGED_REQUESTS).
 
     Returns:
         The generated text as a string, or raises a RuntimeError if all providers fail.
     """
+    key = hashlib.blake2b(f"{prefer!r}|{prompt}".encode('utf-8'), digest_size=16).hexdigest()
+    now = time.monotonic()
+    with _inflight_lock:
+        for k in [k for k, (_, done) in _inflight.items() if done is not None and now - done > COALESCE_TTL]:
+            del _inflight[k]
+        entry = _inflight.get(key)
+        owner = entry is None
+        if owner:
+            future = Future()
+            _inflight[key] = (future, None)
+        else:
+            future = entry[0]
+
+    if not owner:
+        return dict(future.result())
+
+    try:
+        result = _generate_text_uncached(prompt, prefer, hedged)
+    except Exception as e:
+        # Failures are shared with waiting callers but never cached.
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+    with _inflight_lock:
+        _inflight[key] = (future, time.monotonic())
+    future.set_result(result)
+    return dict(result)
+
+
+# Provider key -> (display name, call) for hedged requests.
+_PROVIDERS = {
+    'ignis': ('Ignis', _try_ignis),
+    'gemini': ('Gemini', _try_gemini),
+    'groq': ('Groq', _try_groq),
+}
+# Head start given to each provider before the next one in `prefer` is started.
+HEDGE_DELAY = 0.05
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="provider-hedge")
+
+
+def _race_providers(prompt, prefer):
+    """Start providers in preference order, HEDGE_DELAY apart, and return the first non-empty result.
+
+    Slower providers still running when one succeeds are cancelled if not yet
+    started; already-running calls finish in the background and are ignored.
+    """
+    pending = {}
+
+    def _take_success(done):
+        for future in done:
+            name = pending.pop(future)
+            output = future.result()
+            if output:
+                for other in pending:
+                    other.cancel()
+                logger.info(f"Success with {name} (hedged).")
+                return {'response': output, 'provider': name}
+        return None
+
+    for provider in prefer:
+        if provider not in _PROVIDERS:
+            continue
+        name, call = _PROVIDERS[provider]
+        pending[_hedge_pool.submit(call, prompt)] = name
+        done, _ = wait(pending, timeout=HEDGE_DELAY, return_when=FIRST_COMPLETED)
+        result = _take_success(done)
+        if result:
+            return result
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        result = _take_success(done)
+        if result:
+            return result
+
+    logger.critical("All LLM providers failed to generate a response.")
+    raise RuntimeError("All LLM providers are unavailable or failed.")
+
+
+def _generate_text_uncached(prompt, prefer=None, hedged=None):
     if prefer is None:
         prefer = ('ignis', 'gemini', 'groq')
+    if hedged is None:
+        hedged = APP_CONFIG.PROVIDER_HEDGED_REQUESTS
+    if hedged:
+        return _race_providers(prompt, prefer)
 
     logger.info(f"Generating text with provider preference: {prefer}")
 
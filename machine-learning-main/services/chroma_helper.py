@@ -23,6 +23,23 @@ except ImportError:
 
 _client = None
 _collection = None
+_embedding_function = None
+# Called with the id after every successful upsert, e.g. to drop cached answers built from it.
+_upsert_listeners = []
+
+
+def add_upsert_listener(fn):
+    """Registers `fn(id)` to run after each successful `upsert_knowledge`."""
+    _upsert_listeners.append(fn)
+
+
+def _notify_upsert(id: str):
+    for fn in _upsert_listeners:
+        try:
+            fn(id)
+        except Exception as e:
+            logger.debug(f"Upsert listener failed for ID '{id}': {e}")
+
 
 def init_chroma():
     """Initialize Chroma client and collection. Safe to call multiple times.
@@ -30,7 +47,7 @@ def init_chroma():
     Connects to a remote ChromaDB instance if CHROMA_HOST and CHROMA_PORT
     are set in the environment. Otherwise, it falls back to a local persistent client.
     """
-    global _client, _collection
+    global _client, _collection, _embedding_function
     if not CHROMADB_AVAILABLE:
         return None
 
@@ -61,6 +78,7 @@ def init_chroma():
                 logger.warning("SentenceTransformer embedding function not available. Embeddings will not be generated.")
                 ef = None
             
+            _embedding_function = ef
             _collection = _client.get_or_create_collection(name=APP_CONFIG.CHROMA_COLLECTION_NAME, embedding_function=ef)
             logger.info(f"Chroma collection '{APP_CONFIG.CHROMA_COLLECTION_NAME}' is ready.")
         except Exception as e:
@@ -84,16 +102,42 @@ def upsert_knowledge(id: str, text: str, metadata: Optional[Dict] = None):
         return False
         
     try:
+        if APP_CONFIG.USE_FAISS_RETRIEVAL:
+            # Embed once and hand the same vector to Chroma and the FAISS mirror
+            from brain import faiss_store
+            embedding = embed_text(text)
+            if embedding is not None:
+                vec = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+                _collection.upsert(ids=[id], documents=[text], metadatas=[metadata or {}], embeddings=[vec])
+                faiss_store.add(id, embedding, text, metadata)
+                logger.debug(f"Upserted knowledge with ID: {id}")
+                _notify_upsert(id)
+                return True
         _collection.upsert(ids=[id], documents=[text], metadatas=[metadata or {}])
         logger.debug(f"Upserted knowledge with ID: {id}")
+        _notify_upsert(id)
         return True
     except Exception as e:
         logger.error(f"ChromaDB upsert error for ID '{id}': {e}", exc_info=True)
         return False
 
-def query_similar(text: str, n_results: int = 5) -> List[Dict]:
+def embed_text(text: str):
+    """Embed a single text with the collection's embedding function.
+
+    Returns the embedding vector, or None if no embedding function is available.
+    """
+    if _collection is None:
+        init_chroma()
+    if _embedding_function is None:
+        return None
+    return _embedding_function([text])[0]
+
+def query_similar(text: str, n_results: int = 5, query_embeddings=None) -> List[Dict]:
     """Query Chroma for documents similar to the provided text.
 
+    If `query_embeddings` (a single precomputed vector for `text`) is given,
+    Chroma skips re-embedding the query.
+
     Returns:
         A list of dictionaries, where each dictionary contains the ID, score,
         metadata, and document of a similar item. Returns an empty list on error.
@@ -105,7 +149,11 @@ def query_similar(text: str, n_results: int = 5) -> List[Dict]:
         return []
         
     try:
-        results = _collection.query(query_texts=[text], n_results=n_results)
+        if query_embeddings is not None:
+            vec = query_embeddings.tolist() if hasattr(query_embeddings, 'tolist') else list(query_embeddings)
+            results = _collection.query(query_embeddings=[vec], n_results=n_results)
+        else:
+            results = _collection.query(query_texts=[text], n_results=n_results)
         
         docs = []
         # The API returns results as a dictionary of lists, so we need to transpose it.
@@ -85,43 +85,43 @@ def fetch_graph(limit=1000):
         return {'nodes': list(nodes.values()), 'links': links}
 
 
-    def fetch_node(node_id):
-        d = driver()
-        with d.session() as sess:
-            q = (
-                "MATCH (n:Concept {id: $id})"
-                " RETURN n LIMIT 1"
-            )
-            res = sess.run(q, id=node_id)
-            rec = res.single()
-            if not rec:
-                return None
-            n = rec['n']
-            props = dict(n)
-            props['id'] = node_id
-            return props
-
-
-    def update_node_status(node_id, props: dict):
-        """Set properties on a node identified by id."""
-        def _update(tx, nid, p):
-            set_clause = ', '.join([f"n.{k} = $p.{k}" for k in p.keys()])
-            # build dynamic cypher with parameters
-            cy = f"MATCH (n:Concept {{id: $id}}) SET {set_clause} RETURN n"
-            tx.run(cy, id=nid, p=p)
-
-        _run_write(lambda tx, nid, p: _update(tx, nid, p), node_id, props)
-
-
-    def fetch_nodes_by_status(status: str = 'final', limit: int = 1000):
-        """Fetch node ids with a given status."""
-        d = driver()
-        with d.session() as sess:
-            q = (
-                "MATCH (n:Concept) WHERE coalesce(n.status,'') = $status RETURN n.id AS id, n.label AS label LIMIT $limit"
-            )
-            res = sess.run(q, status=status, limit=limit)
-            out = []
-            for r in res:
-                out.append({'id': r['id'], 'label': r.get('label')})
-            return out
+def fetch_node(node_id):
+    d = driver()
+    with d.session() as sess:
+        q = (
+            "MATCH (n:Concept {id: $id})"
+            " RETURN n LIMIT 1"
+        )
+        res = sess.run(q, id=node_id)
+        rec = res.single()
+        if not rec:
+            return None
+        n = rec['n']
+        props = dict(n)
+        props['id'] = node_id
+        return props
+
+
+def update_node_status(node_id, props: dict):
+    """Set properties on a node identified by id."""
+    def _update(tx, nid, p):
+        set_clause = ', '.join([f"n.{k} = $p.{k}" for k in p.keys()])
+        # build dynamic cypher with parameters
+        cy = f"MATCH (n:Concept {{id: $id}}) SET {set_clause} RETURN n"
+        tx.run(cy, id=nid, p=p)
+
+    _run_write(lambda tx, nid, p: _update(tx, nid, p), node_id, props)
+
+
+def fetch_nodes_by_status(status: str = 'final', limit: int = 1000):
+    """Fetch node ids with a given status."""
+    d = driver()
+    with d.session() as sess:
+        q = (
+            "MATCH (n:Concept) WHERE coalesce(n.status,'') = $status RETURN n.id AS id, n.label AS label LIMIT $limit"
+        )
+        res = sess.run(q, status=status, limit=limit)
+        out = []
+        for r in res:
+            out.append({'id': r['id'], 'label': r.get('label')})
+        return out
@@ -0,0 +1,76 @@
+# services/research_cache.py
+"""Persistent web-research cache backed by SQLite.
+
+`quick_research` results are keyed by the normalized concept and expire after
+RESEARCH_CACHE_TTL seconds, so a concept researched during learning is not
+searched again when rethink or deep learning reaches it.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _connect():
+    """Opens (once) the cache database; returns None if it can't be opened."""
+    global _conn
+    if _conn is not None:
+        return _conn
+    try:
+        path = APP_CONFIG.RESEARCH_CACHE_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS research (concept TEXT PRIMARY KEY, result TEXT NOT NULL, stored_at REAL NOT NULL)")
+        conn.commit()
+        _conn = conn
+    except Exception as e:
+        logger.error(f"Could not open research cache: {e}", exc_info=True)
+    return _conn
+
+
+def _key(concept: str) -> str:
+    return concept.strip().lower()
+
+
+def get(concept: str) -> Optional[str]:
+    """Returns the cached research for `concept` if it is younger than the TTL, else None."""
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT result FROM research WHERE concept = ? AND stored_at >= ?",
+                (_key(concept), time.time() - APP_CONFIG.RESEARCH_CACHE_TTL),
+            ).fetchone()
+        except Exception as e:
+            logger.debug(f"Research cache read failed: {e}")
+            return None
+    return row[0] if row else None
+
+
+def put(concept: str, result: str) -> None:
+    """Stores `result` for `concept`, replacing any older entry."""
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO research (concept, result, stored_at) VALUES (?, ?, ?)",
+                (_key(concept), result, time.time()),
+            )
+            conn.commit()
+        except Exception as e:
+            logger.debug(f"Research cache write failed: {e}")
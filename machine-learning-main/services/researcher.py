@@ -1,8 +1,11 @@
 # services/researcher.py
+import asyncio
 import logging
 import os
 from typing import Optional
 
+from services import research_cache
+
 # Try DuckDuckGo first, but we have fallbacks
 try:
     from duckduckgo_search import DDGS
@@ -13,6 +16,27 @@ except ImportError:
 # Get a logger for this module
 logger = logging.getLogger(__name__)
 
+# Research context is cut to this many characters; no caller uses more
+# (the largest downstream slice is 1000), so longer results only cost tokens.
+RESEARCH_MAX_CHARS = 2000
+
+
+def _join_bounded(texts, limit: int = RESEARCH_MAX_CHARS):
+    """Joins texts with spaces, stops pulling from `texts` once `limit` is reached.
+
+    Returns (joined text truncated to `limit`, number of texts used).
+    """
+    parts = []
+    total = 0
+    for text in texts:
+        if not text:
+            continue
+        parts.append(text)
+        total += len(text) + 1
+        if total >= limit:
+            break
+    return " ".join(parts)[:limit], len(parts)
+
 
 def _search_ddgs(query: str, max_results: int = 5) -> str:
     """DuckDuckGo search (primary method)."""
@@ -22,11 +46,11 @@ def _search_ddgs(query: str, max_results: int = 5) -> str:
     logger.debug(f"Attempting DuckDuckGo search for: '{query}'")
     try:
         with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
+            # Consumed lazily so the iterator is abandoned once there is enough context
+            context, used = _join_bounded(r.get('body') for r in ddgs.text(query, max_results=max_results))
         
-        if results:
-            context = " ".join([r.get('body', '') for r in results if r.get('body')])
-            logger.info(f"✅ DuckDuckGo found {len(results)} results")
+        if context:
+            logger.info(f"✅ DuckDuckGo found {used} results")
             return context
         else:
             logger.debug("DuckDuckGo: No results found")
@@ -61,10 +85,7 @@ def _search_google_custom(query: str, max_results: int = 5) -> str:
         
         results = response.json().get('items', [])
         if results:
-            context = " ".join([
-                r.get('snippet', '') or r.get('title', '')
-                for r in results
-            ])
+            context, _ = _join_bounded(r.get('snippet', '') or r.get('title', '') for r in results)
             logger.info(f"✅ Google CSE found {len(results)} results")
             return context
         else:
@@ -111,6 +132,11 @@ def quick_research(concept: str) -> str:
     Returns:
         A string containing the concatenated search results, or an empty string if all methods fail.
     """
+    cached = research_cache.get(concept)
+    if cached is not None:
+        logger.debug(f"RESEARCHER: Using cached research for: '{concept}'")
+        return cached
+
     logger.info(f"RESEARCHER: Starting quick research for: '{concept}'")
     
     query = f"what is {concept}"
@@ -127,6 +153,8 @@ def quick_research(concept: str) -> str:
             result = method_func(query, max_results=5)
             if result and len(result.strip()) > 50:  # Need substantial content
                 logger.info(f"RESEARCHER: Successfully retrieved results via {method_name}")
+                # Only successes are cached; a failed lookup is retried next time
+                research_cache.put(concept, result)
                 return result
         except Exception as e:
             logger.debug(f"Search method {method_name} failed: {e}")
@@ -136,6 +164,10 @@ def quick_research(concept: str) -> str:
     return ""  # Will trigger Groq synthesis in learning module
 
 
+def _synthesis_prompt(word: str, context: str) -> str:
+    return f"Based on the following information, provide a concise and clear explanation of the term '{word}'. Do not start with introductory phrases like 'Based on the information provided...'. Just give the explanation directly. Information: \n\n{context}"
+
+
 def research_new_concept(word: str, llm_client) -> str:
     """Researches a new concept using web search and an LLM for deep analysis.
 
@@ -157,7 +189,7 @@ def research_new_concept(word: str, llm_client) -> str:
     # Use the LLM to generate a final, clean explanation
     if llm_client:
         logger.info("RESEARCHER: Synthesizing with LLM.")
-        prompt = f"Based on the following information, provide a concise and clear explanation of the term '{word}'. Do not start with introductory phrases like 'Based on the information provided...'. Just give the explanation directly. Information: \n\n{context}"
+        prompt = _synthesis_prompt(word, context)
         
         try:
             response = llm_client.generate_content(prompt)
@@ -171,3 +203,30 @@ def research_new_concept(word: str, llm_client) -> str:
         logger.warning("RESEARCHER: LLM client is not available. Cannot synthesize explanation.")
         # Fallback to returning raw context if no LLM is present
         return context
+
+
+async def research_new_concept_async(word: str, llm_client) -> str:
+    """Async form of `research_new_concept` using the client's `generate_content_async`.
+
+    Web search has no async client, so it runs in a worker thread; the LLM
+    synthesis awaits the model directly instead of holding a thread.
+    """
+    logger.info(f"RESEARCHER: Starting deep research for new concept: '{word}'")
+    context = await asyncio.to_thread(quick_research, word)
+
+    if not context:
+        logger.info(f"RESEARCHER: No web search results for '{word}', will use LLM synthesis only")
+        return ""
+
+    if not llm_client:
+        logger.warning("RESEARCHER: LLM client is not available. Cannot synthesize explanation.")
+        return context
+
+    logger.info("RESEARCHER: Synthesizing with LLM.")
+    try:
+        response = await llm_client.generate_content_async(_synthesis_prompt(word, context))
+        logger.info(f"RESEARCHER: Successfully synthesized explanation for '{word}'.")
+        return response.text
+    except Exception as e:
+        logger.warning(f"RESEARCHER: LLM synthesis failed for '{word}': {e}")
+        return ""
@@ -1,10 +1,13 @@
 import os
+import sys
 import logging
 import json
+import functools
 import firebase_admin
 from firebase_admin import credentials, firestore
 import google.generativeai as genai
 from google.generativeai import types
+import httpx
 from groq import Groq
 import spacy
 
@@ -15,6 +18,17 @@ logging.basicConfig(level=APP_CONFIG.LOG_LEVEL,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401 - lets httpx negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Keep-alive pool shared by every Groq request, so concurrent learning
+# workers reuse warm TLS connections instead of handshaking per call.
+HTTP_MAX_KEEPALIVE = 32
+HTTP_MAX_CONNECTIONS = 64
+
 
 # --- Service Initialization Functions ---
 
@@ -41,6 +55,22 @@ def _initialize_firebase():
         logger.critical(f"Firebase initialization failed: {e}", exc_info=True)
         return None
 
+def _initialize_async_firestore():
+    """Creates an async Firestore client sharing the Firebase app's credentials.
+
+    The client binds to the event loop it is first used on, so it is only used
+    from the shared loop in brain.scheduler.
+    """
+    try:
+        if db is None:
+            return None
+        from google.cloud.firestore import AsyncClient
+        app = firebase_admin.get_app()
+        return AsyncClient(project=app.project_id, credentials=app.credential.get_credential())
+    except Exception as e:
+        logger.error(f"Async Firestore client initialization failed: {e}", exc_info=True)
+        return None
+
 def _configure_gemini():
     """Configures the Google GenAI library with the API key."""
     try:
@@ -60,15 +90,26 @@ def _initialize_groq():
         if not APP_CONFIG.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY not found in config.")
         
-        return Groq(api_key=APP_CONFIG.GROQ_API_KEY)
+        http_client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_keepalive_connections=HTTP_MAX_KEEPALIVE, max_connections=HTTP_MAX_CONNECTIONS),
+            timeout=APP_CONFIG.PROVIDER_TIMEOUT,
+        )
+        # Retries are handled by services.ai_providers.retry_with_backoff.
+        return Groq(api_key=APP_CONFIG.GROQ_API_KEY, timeout=APP_CONFIG.PROVIDER_TIMEOUT, max_retries=0,
+                    http_client=http_client)
     except Exception as e:
         logger.error(f"Failed to initialize Groq client: {e}", exc_info=True)
         return None
 
+# Nothing reads named entities, so NER is left out of the pipeline. attribute_ruler
+# stays: it maps tagger output to token.pos_, which the lemmatizer and callers need.
+SPACY_EXCLUDED_PIPES = ["ner"]
+
 def _load_spacy_model():
     """Loads the spaCy model. Downloads it if not found."""
     try:
-        nlp = spacy.load(APP_CONFIG.SPACY_MODEL)
+        nlp = spacy.load(APP_CONFIG.SPACY_MODEL, exclude=SPACY_EXCLUDED_PIPES)
         logger.info(f"spaCy model '{APP_CONFIG.SPACY_MODEL}' loaded.")
         return nlp
     except OSError:
@@ -76,7 +117,7 @@ def _load_spacy_model():
         try:
             from spacy.cli import download
             download(APP_CONFIG.SPACY_MODEL)
-            nlp = spacy.load(APP_CONFIG.SPACY_MODEL)
+            nlp = spacy.load(APP_CONFIG.SPACY_MODEL, exclude=SPACY_EXCLUDED_PIPES)
             logger.info(f"spaCy model '{APP_CONFIG.SPACY_MODEL}' downloaded and loaded successfully.")
             return nlp
         except Exception as e:
@@ -85,11 +126,20 @@ def _load_spacy_model():
 
 # --- Initialize and Expose Services ---
 db = _initialize_firebase()
+adb = _initialize_async_firestore()
 gemini_configured = _configure_gemini()
 groq_client = _initialize_groq()
 nlp = _load_spacy_model()
 
 
+@functools.lru_cache(maxsize=None)
+def get_gemini_model(model_name: str = APP_CONFIG.GEMINI_MODEL):
+    """Returns a shared GenerativeModel for `model_name`; None if Gemini isn't configured."""
+    if not gemini_configured:
+        return None
+    return genai.GenerativeModel(model_name)
+
+
 # --- Gemini Helper with Persona ---
 def generate_structured_gemini_content(contents: any) -> str:
     """
@@ -139,6 +189,13 @@ def get_health_status():
     }
     all_ok = all(status.get('online', False) or status.get('configured', False) for status in health.values())
     health["all_services_ok"] = all_ok
+    # Only report cache stats if the knowledge base is already loaded; don't import it from here
+    kb = sys.modules.get("brain.knowledge_base")
+    if kb is not None:
+        try:
+            health["embedding_cache"] = kb.embedding_cache_stats()
+        except Exception:
+            pass
     return health
 
 # Log the health status on startup
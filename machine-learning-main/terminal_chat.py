@@ -17,8 +17,7 @@ if __name__ == "__main__":
             break
         
         try:
-            response_data = generate_response_from_knowledge(prompt)
-            assistant_response = response_data.get("synthesized_answer")
+            assistant_response = "".join(generate_response_from_knowledge(prompt))
             
             # If the AI can't provide a direct answer from its knowledge, log words for learning
             if not assistant_response:
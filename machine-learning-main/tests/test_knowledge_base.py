@@ -0,0 +1,26 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+kb = pytest.importorskip("brain.knowledge_base")
+
+
+def _failure(attempts):
+    # Mirrors google.cloud.firestore_v1.bulk_writer.BulkWriteFailure's attributes
+    return SimpleNamespace(
+        operation=SimpleNamespace(reference=SimpleNamespace(path="unknown_words/tcp")),
+        code=14,
+        message="unavailable",
+        attempts=attempts,
+    )
+
+
+def test_retry_bulk_write_retries_below_max_attempts():
+    assert kb._retry_bulk_write(_failure(kb.BULK_WRITE_MAX_ATTEMPTS - 1), None) is True
+
+
+def test_retry_bulk_write_gives_up_and_logs_at_max_attempts(caplog):
+    with caplog.at_level(logging.ERROR, logger=kb.logger.name):
+        assert kb._retry_bulk_write(_failure(kb.BULK_WRITE_MAX_ATTEMPTS), None) is False
+    assert "unknown_words/tcp" in caplog.text
@@ -2,17 +2,8 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def categorize_text(text: str, gemini_client) -> str:
-    """Classifies a given text into one of the four dimensions of knowledge.
-
-    Args:
-        text: The text to classify.
-        gemini_client: An instance of a generative AI model client.
-
-    Returns:
-        The name of the dimension, or an empty string if classification fails.
-    """
-    prompt = f'''
+def _classification_prompt(text: str) -> str:
+    return f'''
 Analyze the following text and classify it into one of the four dimensions of knowledge:
 
 1.  **Factual:** A simple, verifiable piece of information. (e.g., "The sky is blue," "Gravity is 9.81 m/s^2.")
@@ -25,9 +16,32 @@ Respond with only the name of the dimension: "Factual", "Conceptual", "Procedura
 Text to classify:
 "{text}"
 '''
+
+
+def categorize_text(text: str, gemini_client) -> str:
+    """Classifies a given text into one of the four dimensions of knowledge.
+
+    Args:
+        text: The text to classify.
+        gemini_client: An instance of a generative AI model client.
+
+    Returns:
+        The name of the dimension, or an empty string if classification fails.
+    """
+    prompt = _classification_prompt(text)
     try:
         response = gemini_client.generate_content(prompt)
         return response.text.strip()
     except Exception as e:
         logger.error(f"Error classifying text: {e}", exc_info=True)
         return ""
+
+
+async def categorize_text_async(text: str, gemini_client) -> str:
+    """Async form of `categorize_text` using the client's `generate_content_async`."""
+    try:
+        response = await gemini_client.generate_content_async(_classification_prompt(text))
+        return response.text.strip()
+    except Exception as e:
+        logger.error(f"Error classifying text: {e}", exc_info=True)
+        return ""
@@ -1,3 +1,4 @@
+import functools
 import logging
 from services.services import db
 
@@ -16,6 +17,46 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# Updates per WriteBatch (Firestore caps a batch at 500 writes).
+RELATIONSHIP_BATCH_SIZE = 450
+# Document refs fetched per get_all() call.
+GET_ALL_CHUNK_SIZE = 100
+
+
+# Synset relation -> the knowledge field its lemma names are stored in.
+_RELATIONS = (
+    ('hypernyms', 'related_to'),        # more general concepts
+    ('member_holonyms', 'related_to'),  # wholes this is a part of
+    ('hyponyms', 'subtopics'),          # more specific concepts
+    ('part_meronyms', 'subtopics'),     # parts of
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _wordnet_relations(word):
+    """Returns {'related_to': [...], 'subtopics': [...]} from WordNet, or None if there are no synsets.
+
+    Memoized: the same words recur across learning cycles. Callers must not mutate the result.
+    """
+    # Get the synsets for the word
+    synsets = wordnet.synsets(word)
+
+    if not synsets:
+        logger.debug(f"No WordNet synsets found for '{word}'.")
+        return None
+
+    # Use the first synset as the primary one
+    main_synset = synsets[0]
+
+    # One pass over the four relations, deduplicating straight into the two fields
+    fields = {'related_to': set(), 'subtopics': set()}
+    for relation, field in _RELATIONS:
+        names = {target.lemmas()[0].name() for target in getattr(main_synset, relation)()}
+        logger.debug("  - %s (%s): %s", relation, field, names)
+        fields[field] |= names
+    return {field: list(names) for field, names in fields.items()}
+
+
 def find_and_map_relationships(word):
     """
     Finds and maps relationships for a given word using WordNet.
@@ -29,47 +70,65 @@ def find_and_map_relationships(word):
         return
     
     try:
-        # Get the synsets for the word
-        synsets = wordnet.synsets(word)
-        
-        if not synsets:
-            logger.debug(f"No WordNet synsets found for '{word}'.")
+        relations = _wordnet_relations(word)
+        if relations is None:
             return
 
-        # Use the first synset as the primary one
-        main_synset = synsets[0]
-
-        # Get hypernyms (more general concepts)
-        hypernyms = main_synset.hypernyms()
-        hypernym_names = [h.lemmas()[0].name() for h in hypernyms]
-
-        # Get hyponyms (more specific concepts)
-        hyponyms = main_synset.hyponyms()
-        hyponym_names = [h.lemmas()[0].name() for h in hyponyms]
-
-        # Get meronyms (parts of)
-        part_meronyms = main_synset.part_meronyms()
-        part_meronym_names = [m.lemmas()[0].name() for m in part_meronyms]
-
-        # Get holonyms (wholes that this is a part of)
-        member_holonyms = main_synset.member_holonyms()
-        member_holonym_names = [h.lemmas()[0].name() for h in member_holonyms]
-
         # Update Firestore with the new relationships
         doc_ref = db.collection('solidified_knowledge').document(word)
-        doc_ref.update({
-            'related_to': list(set(hypernym_names + member_holonym_names)),
-            'subtopics': list(set(hyponym_names + part_meronym_names))
-        })
+        doc_ref.update(relations)
 
         logger.info(f"Mapped relationships for '{word}':")
-        logger.debug(f"  - Hypernyms (related_to): {hypernym_names}")
-        logger.debug(f"  - Hyponyms (subtopics): {hyponym_names}")
-        logger.debug(f"  - Meronyms (subtopics): {part_meronym_names}")
-        logger.debug(f"  - Holonyms (related_to): {member_holonym_names}")
     
     except LookupError as e:
         logger.debug(f"WordNet resource missing for relationship mapping: {e}")
         # Silently skip - this is expected if wordnet corpus not downloaded
     except Exception as e:
         logger.debug(f"Error mapping relationships for '{word}': {e}")
+
+
+def find_and_map_relationships_bulk(words):
+    """Bulk form of `find_and_map_relationships` for many words.
+
+    Relations are computed locally for every word first. Which concept docs
+    exist is then read with chunked get_all calls, and the updates are
+    committed in WriteBatches. That replaces one update RPC per word, and
+    missing docs are skipped just as the per-word update would fail on them.
+    Returns the number of documents updated.
+    """
+    if not wordnet or not words:
+        return 0
+
+    pending = {}
+    for word in words:
+        try:
+            relations = _wordnet_relations(word)
+        except LookupError as e:
+            logger.debug(f"WordNet resource missing for relationship mapping: {e}")
+            return 0
+        except Exception as e:
+            logger.debug(f"Error mapping relationships for '{word}': {e}")
+            continue
+        if relations is not None:
+            pending[word] = relations
+    if not pending:
+        return 0
+
+    updated = 0
+    try:
+        collection = db.collection('solidified_knowledge')
+        refs = [collection.document(word) for word in pending]
+        existing = []
+        for i in range(0, len(refs), GET_ALL_CHUNK_SIZE):
+            existing.extend(snap.reference for snap in db.get_all(refs[i:i + GET_ALL_CHUNK_SIZE], field_paths=[])
+                            if snap.exists)
+        for i in range(0, len(existing), RELATIONSHIP_BATCH_SIZE):
+            batch = db.batch()
+            for ref in existing[i:i + RELATIONSHIP_BATCH_SIZE]:
+                batch.update(ref, pending[ref.id])
+            batch.commit()
+        updated = len(existing)
+        logger.info(f"Mapped relationships for {updated} of {len(words)} words.")
+    except Exception as e:
+        logger.debug(f"Error bulk-mapping relationships: {e}")
+    return updated